@@ -2,72 +2,213 @@
 
 # agent.py
 
-import time
-import schedule # For scheduling periodic tasks
+from __future__ import annotations # Annotations stay unevaluated, so Incident is only imported for type checking
+
+import asyncio # Event loop driving the polling loop and incident processing
+import atexit # For flushing queued log records on interpreter exit
+import math # For rounding the adaptive polling interval
+import random # Jitter for Jira retry backoff
+import collections # For the bounded LRU of recently seen incident contents
+import functools # For binding arguments to callables run in the thread pool
+import hashlib # For content hashes used in duplicate detection
+import signal # For graceful shutdown on SIGINT/SIGTERM
+import time # Monotonic clock for the polling loop
+from concurrent.futures import ThreadPoolExecutor # Runs blocking SMTP/IMAP/Jira calls off the event loop
+from typing import TYPE_CHECKING, List, Optional, Tuple
 import logging # For comprehensive logging
+import logging.handlers # For QueueHandler/QueueListener (non-blocking logging)
+import queue # Log record queue between callers and the writer thread
 import sys # For sys.exit
 
 # Import custom modules
-from config_manager import ConfigManager
-from email_handler import EmailHandler
-from incident_parser import IncidentParser
-from incident_classifier import IncidentClassifier
-from jira_handler import JiraHandler
-from models import Incident # Pydantic model for Incident
+# Only the lightweight config module is imported eagerly; the handler modules (which pull in
+# jira/requests, the email parser, etc.) are imported when the agent is constructed.
+from config_manager import get_config
+
+if TYPE_CHECKING:
+    from models import Incident # Dataclass model for Incident
 
 # --- Global Logging Configuration ---
 # This configures the root logger. All module loggers will inherit this.
 # Adjust level for more/less verbosity (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(name)s - [%(module)s.%(funcName)s:%(lineno)d] - %(message)s',
-    handlers=[
-        logging.FileHandler("incident_agent.log", mode='a'), # Append to log file
-        logging.StreamHandler(sys.stdout) # Log to console
-    ]
+# Logging calls only enqueue the record; a background QueueListener thread does the
+# (blocking) file and console writes, so concurrent incident processing never waits on log I/O.
+_log_formatter = logging.Formatter(
+    '%(asctime)s - %(levelname)s - %(name)s - [%(module)s.%(funcName)s:%(lineno)d] - %(message)s'
 )
+_log_output_handlers = [
+    logging.FileHandler("incident_agent.log", mode='a'), # Append to log file
+    logging.StreamHandler(sys.stdout) # Log to console
+]
+for _handler in _log_output_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = logging.handlers.QueueListener(_log_queue, *_log_output_handlers, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop) # Drain remaining records before the process exits
 # Get a logger for this specific module (agent.py)
 logger = logging.getLogger(__name__)
 
+# Maximum number of recent incident content hashes remembered for duplicate detection.
+DEDUP_CACHE_SIZE = 10_000
+# Only this many leading characters of the (normalized) body contribute to the content hash.
+DEDUP_BODY_CHARS = 4096
+# Longest wait before retrying a transiently failed Jira request. The check cycle awaits the retries, so a
+# batch whose Retry-After asks for longer is given up on rather than stalling fetching and acknowledgements.
+JIRA_MAX_RETRY_DELAY_SECONDS = 60
+
 
 class IncidentManagementAgent:
     """
     The main AI agent class that orchestrates the incident management process.
     It fetches incidents, classifies them, assigns them, acknowledges, and creates Jira tickets.
     """
+    # Fixed attribute layout (no per-instance __dict__); extend this when adding new attributes.
+    __slots__ = ('config', 'parser', 'email_handler', 'classifier', 'jira_handler', '_pool', '_seen', '_current_interval', '_jira_sem')
+
     def __init__(self):
         logger.info("--- Initializing Incident Management Agent ---")
         try:
+            from email_handler import EmailHandler
+            from incident_parser import IncidentParser
+            from incident_classifier import IncidentClassifier
+            from jira_handler import JiraHandler
+
             # Initialize core components
-            self.config = ConfigManager() # Load configurations first
-            logger.info(f"Agent Name: {self.config.agent_name}")
-            logger.info(f"Configuration loaded. Check interval: {self.config.check_interval_seconds}s.")
+            self.config = get_config() # Load configurations first (cached per file path)
+            logger.info("Agent Name: %s", self.config.agent_name)
+            logger.info("Configuration loaded. Check interval: %ss.", self.config.check_interval_seconds)
             
             # Log key configurations (be careful with logging sensitive info, even if usernames are "public")
-            logger.info(f"IMAP: Server='{self.config.imap_server}', User='{self.config.imap_username is not None}'")
-            logger.info(f"SMTP: Server='{self.config.smtp_server}', User='{self.config.smtp_username is not None}', Sender='{self.config.sender_email}'")
-            logger.info(f"Jira: URL='{self.config.jira_url}', User='{self.config.jira_username is not None}', Project='{self.config.jira_project_key}'")
+            logger.info("IMAP: Server='%s', User='%s'", self.config.imap_server, self.config.imap_username is not None)
+            logger.info("SMTP: Server='%s', User='%s', Sender='%s'", self.config.smtp_server, self.config.smtp_username is not None, self.config.sender_email)
+            logger.info("Jira: URL='%s', User='%s', Project='%s'", self.config.jira_url, self.config.jira_username is not None, self.config.jira_project_key)
 
             self.parser = IncidentParser()
             self.email_handler = EmailHandler(self.config, self.parser)
             self.classifier = IncidentClassifier(self.config)
-            self.jira_handler = JiraHandler(self.config) # Jira connection is attempted during its __init__
+            self.jira_handler = JiraHandler(self.config) # Connects lazily, on the first P1 ticket
+
+            # Blocking network calls (IMAP fetch, SMTP acks, Jira REST) run in this pool so that
+            # several incidents can be processed concurrently from the event loop.
+            self._pool = ThreadPoolExecutor(max_workers=self.config.async_workers, thread_name_prefix="incident-io")
+            logger.info("I/O worker pool started with %s worker(s).", self.config.async_workers)
+
+            # Content hash -> (first incident ID, time.monotonic() first seen, reports received), oldest first.
+            # Folds repeated reports of the same event within DuplicateWindowMinutes into one (no duplicate
+            # acks/Jira tickets). Only the ID is kept, not the Incident itself.
+            self._seen: "collections.OrderedDict[str, Tuple[str, float, int]]" = collections.OrderedDict()
+
+            # Current polling interval; adapted after every polled check cycle (see _next_check_interval).
+            self._current_interval: int = min(
+                self.config.max_check_interval_seconds,
+                max(self.config.min_check_interval_seconds, self.config.check_interval_seconds)
+            )
+
+            # Limits concurrent Jira requests; created on first use (see _create_jira_tickets).
+            self._jira_sem: Optional[asyncio.Semaphore] = None
             
             logger.info("--- All agent components initialized successfully ---")
         except FileNotFoundError as e:
-            logger.critical(f"CRITICAL ERROR: Configuration file (e.g., config.ini) not found. {e}. Agent cannot start.")
+            logger.critical("CRITICAL ERROR: Configuration file (e.g., config.ini) not found. %s. Agent cannot start.", e)
             # For critical startup errors, re-raising helps stop the script immediately.
             raise
         except Exception as e:
-            logger.critical(f"CRITICAL ERROR during agent initialization: {e}", exc_info=True)
+            logger.critical("CRITICAL ERROR during agent initialization: %s", e, exc_info=True)
             raise
 
-    def _process_single_incident(self, incident: Incident):
+    @staticmethod
+    def _content_key(incident: Incident) -> str:
+        """Hash of subject, sender and whitespace/case-normalized body prefix identifying duplicate reports."""
+        body_normalized = " ".join(incident.body[:DEDUP_BODY_CHARS].split()).lower()
+        content = "\x1f".join((incident.subject.strip().lower(), incident.sender, body_normalized))
+        return hashlib.sha1(content.encode("utf-8", errors="replace")).hexdigest()
+
+    def _drop_duplicate_incidents(self, incidents: List[Incident]) -> List[Incident]:
+        """
+        Filters out incidents whose content was first seen less than DuplicateWindowMinutes ago (in this or
+        an earlier cycle). The window runs from the first report and is not extended by duplicates, so an
+        alert that keeps recurring is processed again once per window.
+        """
+        now = time.monotonic()
+        window_seconds = self.config.duplicate_window_minutes * 60
+        # Entries are never reordered, so the expired ones are at the front.
+        while self._seen and now - next(iter(self._seen.values()))[1] >= window_seconds:
+            self._seen.popitem(last=False)
+
+        unique_incidents: List[Incident] = []
+        for incident in incidents:
+            key = self._content_key(incident)
+            entry = self._seen.get(key)
+            if entry is not None:
+                first_id, first_seen, count = entry
+                self._seen[key] = (first_id, first_seen, count + 1) # Keeps its position
+                logger.info(
+                    "[%s] Skipping incident ID %s: duplicate of incident ID %s (received %s times in %.0f min).",
+                    self.config.agent_name, incident.id, first_id, count + 1, (now - first_seen) / 60
+                )
+                continue
+            self._seen[key] = (incident.id, now, 1)
+            if len(self._seen) > DEDUP_CACHE_SIZE:
+                self._seen.popitem(last=False) # Evict the oldest entry
+            unique_incidents.append(incident)
+        return unique_incidents
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Runs a blocking callable in the agent's I/O thread pool and awaits its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+
+    async def _create_jira_tickets(self, incidents: List[Incident]) -> List[Optional[str]]:
+        """
+        Creates Jira tickets for a batch of incidents in one bulk request, with at most
+        `jira_max_concurrent` requests in flight. Transiently failed attempts (rate limiting,
+        gateway errors, failures to connect) are retried up to `jira_max_retries` times with
+        jittered exponential backoff, honouring Retry-After up to JIRA_MAX_RETRY_DELAY_SECONDS
+        (a longer Retry-After fails the batch).
+
+        Returns:
+            The created ticket keys (or None per failed incident), in the order of `incidents`.
+        """
+        from jira_handler import JiraTransientError # Already loaded by __init__; this is a sys.modules lookup
+
+        max_attempts = self.config.jira_max_retries + 1
+        if self._jira_sem is None: # Created here so cycles run without start_agent() (one-shot use, tests) work too
+            self._jira_sem = asyncio.Semaphore(self.config.jira_max_concurrent)
+        async with self._jira_sem:
+            for attempt in range(max_attempts):
+                try:
+                    return await self._run_blocking(self.jira_handler.create_jira_tickets_bulk, incidents)
+                except JiraTransientError as e:
+                    if attempt == max_attempts - 1:
+                        break
+                    if e.retry_after is not None and e.retry_after > JIRA_MAX_RETRY_DELAY_SECONDS:
+                        logger.error(
+                            "Jira asked to wait %.0fs before retrying (more than %ss); giving up on %s ticket(s).",
+                            e.retry_after, JIRA_MAX_RETRY_DELAY_SECONDS, len(incidents)
+                        )
+                        for incident in incidents:
+                            incident.add_note(f"Jira ticket creation failed: Jira asked to retry after {e.retry_after:.0f}s, which is longer than the agent waits.")
+                        return [None] * len(incidents)
+                    # Jitter spreads out the retries of concurrent batches so they do not hit Jira in lockstep.
+                    delay = e.retry_after if e.retry_after is not None else min(2 ** attempt, JIRA_MAX_RETRY_DELAY_SECONDS) + random.uniform(0, 1)
+                    logger.warning(
+                        "Jira request failed transiently (%s); retrying %s ticket(s) in %.1fs (attempt %s/%s).",
+                        e, len(incidents), delay, attempt + 2, max_attempts
+                    )
+                    await asyncio.sleep(delay)
+        for incident in incidents:
+            incident.add_note(f"Jira ticket creation failed: still failing transiently after {max_attempts} attempts.")
+        return [None] * len(incidents)
+
+    def _classify_incident(self, incident: Incident):
         """
-        Private method to handle the lifecycle of a single incident.
-        Includes classification, assignment, acknowledgement, and P1 Jira ticket creation.
+        Classifies priority and assigns the team of a single incident (CPU-only, runs inline).
         """
-        logger.info(f"--- Starting processing for Incident ID: {incident.id}, Subject: '{incident.subject}' ---")
+        logger.info("--- Starting processing for Incident ID: %s, Subject: '%s' ---", incident.id, incident.subject)
         incident.add_note(f"Agent '{self.config.agent_name}' received and started processing.")
 
         # 1. Classify Priority
@@ -80,108 +221,273 @@ class IncidentManagementAgent:
         incident.assigned_team_email = team_email_address
         # Detailed logging for assignment happens within the classifier method.
 
+    async def _create_p1_tickets(self, p1_incidents: List[Incident]):
+        """
+        Creates Jira tickets for all P1 incidents of a cycle with bulk requests (one per
+        BULK_CREATE_MAX_ISSUES incidents, sent concurrently), before acknowledgements go out
+        so they can include the ticket keys.
+        """
+        logger.info("%s P1 incident(s) in this cycle. Attempting to create Jira ticket(s).", len(p1_incidents))
+        # Creates the Jira client on the first P1 (off the event loop); False if it is not configured or failed.
+        if not await self._run_blocking(self.jira_handler.ensure_connected):
+            message = "Jira client is not available (e.g., connection failed or not configured). Cannot create P1 ticket."
+            for incident in p1_incidents:
+                logger.error("Incident %s: %s", incident.id, message)
+                incident.add_note(f"Jira ticket creation skipped: {message}")
+            return
+        # Emails cut at the triage fetch limit are fetched in full so the tickets carry the whole body.
+        await self._run_blocking(self.email_handler.fetch_full_bodies, p1_incidents)
+
+        # Bulk requests overlap on the I/O pool; `_jira_sem` caps how many are in flight at once.
+        batch_size = self.jira_handler.BULK_CREATE_MAX_ISSUES
+        batches = [p1_incidents[start:start + batch_size] for start in range(0, len(p1_incidents), batch_size)]
+        # return_exceptions: an unexpected error in one batch must not discard the tickets created by the others.
+        batch_results = await asyncio.gather(*(self._create_jira_tickets(batch) for batch in batches), return_exceptions=True)
+        ticket_keys: List[Optional[str]] = []
+        for batch, result in zip(batches, batch_results):
+            if isinstance(result, Exception):
+                logger.error("Unexpected error creating Jira tickets for %s incident(s): %s", len(batch), result, exc_info=result)
+                for incident in batch:
+                    incident.add_note(f"Unexpected error creating Jira ticket: {result}")
+                result = [None] * len(batch)
+            ticket_keys.extend(result)
+        for incident, ticket_key in zip(p1_incidents, ticket_keys):
+            if ticket_key:
+                # The jira_handler updates incident.jira_ticket_key and logs success.
+                logger.info("Incident %s: P1 Jira ticket %s successfully created.", incident.id, ticket_key)
+            else:
+                logger.error("Incident %s: Failed to create Jira ticket for P1 (see JiraHandler logs for details).", incident.id)
+
+    async def _acknowledge_incidents(self, incidents: List[Incident]):
+        """
+        Private coroutine that sends the acknowledgements for a batch of classified incidents
+        (offloaded to the I/O pool as one call, so they share a single SMTP session).
+        """
         # 3. "Auto-Attend" - Send Acknowledgement Email
         # The acknowledgement is typically sent to the assigned team, or could be to original reporter if parsed.
-        # For this setup, we'll acknowledge the assigned team.
-        if incident.assigned_team_email:
-            self.email_handler.send_acknowledgement_email(incident, recipient_email=incident.assigned_team_email)
-        else:
-            logger.warning(f"Incident {incident.id}: No team email available for acknowledgement (Assigned Team: {incident.assigned_team}).")
-            incident.add_note("Acknowledgement email skipped: No assigned team email was determined.")
-        # Logging for email sending (success/failure) happens within the email_handler method.
-
-        # 4. Create Jira Ticket for P1 issues
-        if incident.priority == "P1":
-            logger.info(f"Incident {incident.id} is P1. Attempting to create Jira ticket.")
-            if self.jira_handler.jira_client: # Check if Jira client is available (connection successful)
-                ticket_key = self.jira_handler.create_jira_ticket_for_incident(incident)
-                if ticket_key:
-                    # The jira_handler updates incident.jira_ticket_key and logs success.
-                    # If acknowledgement email was already sent, it won't have the Jira key.
-                    # Consider sending a second notification or updating the ack email logic if Jira key is critical for initial ack.
-                    logger.info(f"Incident {incident.id}: P1 Jira ticket {ticket_key} successfully created.")
-                else:
-                    logger.error(f"Incident {incident.id}: Failed to create Jira ticket for P1 (see JiraHandler logs for details).")
+        # For this setup, we'll acknowledge the assigned team. P1 tickets were created beforehand,
+        # so the acknowledgement includes the Jira key when there is one.
+        ackable_incidents: List[Incident] = []
+        for incident in incidents:
+            if incident.assigned_team_email:
+                ackable_incidents.append(incident)
             else:
-                message = "Jira client is not available (e.g., connection failed or not configured). Cannot create P1 ticket."
-                logger.error(f"Incident {incident.id}: {message}")
-                incident.add_note(f"Jira ticket creation skipped: {message}")
-        # No verbose logging for non-P1s not getting a ticket, as that's expected.
+                logger.warning("Incident %s: No team email available for acknowledgement (Assigned Team: %s).", incident.id, incident.assigned_team)
+                incident.add_note("Acknowledgement email skipped: No assigned team email was determined.")
+        if ackable_incidents:
+            # Logging for email sending (success/failure) happens within the email_handler method.
+            await self._run_blocking(self.email_handler.send_acknowledgement_emails, ackable_incidents)
 
+    @staticmethod
+    def _log_final_state(incident: Incident):
+        """Logs the final processing state of an incident at the end of the cycle."""
         logger.info(
-            f"--- Finished processing Incident ID: {incident.id}. "
-            f"Final State: Priority='{incident.priority}', Team='{incident.assigned_team}', "
-            f"JiraKey='{incident.jira_ticket_key}', AckSent='{incident.is_acknowledged}' ---"
+            "--- Finished processing Incident ID: %s. "
+            "Final State: Priority='%s', Team='%s', "
+            "JiraKey='%s', AckSent='%s' ---",
+            incident.id, incident.priority, incident.assigned_team, incident.jira_ticket_key, incident.is_acknowledged
+        )
+        if logger.isEnabledFor(logging.DEBUG): # Avoid touching the (potentially long) notes list otherwise
+            logger.debug("Incident %s final processing notes: %s", incident.id, list(incident.processing_notes))
+
+    def _record_processing_error(self, incident: Incident, error: BaseException):
+        """Logs an error specific to processing a single incident; the rest of the batch is unaffected."""
+        logger.error(
+            "[%s] Unhandled error while processing incident ID %s: %s",
+            self.config.agent_name, incident.id, error,
+            exc_info=error # Include stack trace for this error
         )
-        logger.debug(f"Incident {incident.id} final processing notes: {incident.processing_notes}")
+        # Optionally, add a failure note to the incident object itself if it's recoverable or for audit.
+        incident.add_note(f"CRITICAL AGENT ERROR during processing: {error}")
 
-    def run_incident_check_cycle(self):
+    async def run_incident_check_cycle(self) -> int:
         """
         Executes one full cycle of checking for new incidents and processing them.
-        This method is designed to be called periodically by the scheduler.
+        This coroutine is designed to be awaited periodically by the polling loop.
+
+        Returns:
+            The number of new (non-duplicate) incidents found in this cycle; 0 if fetching failed.
         """
-        logger.info(f"[{self.config.agent_name}] === Starting new incident check cycle ===")
+        newly_fetched_incidents: List[Incident] = []
+        logger.info("[%s] === Starting new incident check cycle ===", self.config.agent_name)
         try:
             # Step 1: Fetch new raw incidents (currently from email)
             # The email_handler will parse them into Incident objects if they are valid.
-            newly_fetched_incidents: List[Incident] = self.email_handler.fetch_new_incidents_from_email()
+            newly_fetched_incidents = await self._run_blocking(self.email_handler.fetch_new_incidents_from_email)
+            # Step 2: Drop repeated reports of the same event before any acks or Jira tickets are produced.
+            newly_fetched_incidents = self._drop_duplicate_incidents(newly_fetched_incidents)
             
             if not newly_fetched_incidents:
                 # This is a normal occurrence, so INFO level is appropriate.
-                logger.info(f"[{self.config.agent_name}] No new incidents found in this check cycle.")
+                logger.info("[%s] No new incidents found in this check cycle.", self.config.agent_name)
             else:
-                logger.info(f"[{self.config.agent_name}] Fetched {len(newly_fetched_incidents)} new potential incident(s) to process.")
+                logger.info("[%s] Fetched %s new potential incident(s) to process.", self.config.agent_name, len(newly_fetched_incidents))
+                # Step 3: Classify and assign every incident first (cheap, CPU-local).
+                classified_incidents: List[Incident] = []
                 for incident_obj in newly_fetched_incidents:
                     try:
-                        self._process_single_incident(incident_obj)
+                        self._classify_incident(incident_obj)
                     except Exception as e:
-                        # Log error specific to processing this single incident but allow the agent to continue with others.
-                        logger.error(
-                            f"[{self.config.agent_name}] Unhandled error while processing incident ID {incident_obj.id}: {e}", 
-                            exc_info=True # Include stack trace for this error
-                        )
-                        # Optionally, add a failure note to the incident object itself if it's recoverable or for audit.
-                        incident_obj.add_note(f"CRITICAL AGENT ERROR during processing: {e}")
+                        self._record_processing_error(incident_obj, e)
+                        continue
+                    classified_incidents.append(incident_obj)
+
+                # Step 4: Create Jira tickets for all P1s of this cycle in one bulk request.
+                p1_incidents = [incident_obj for incident_obj in classified_incidents if incident_obj.priority == "P1"]
+                if p1_incidents:
+                    await self._create_p1_tickets(p1_incidents)
+
+                # Step 5: Acknowledge the batch over one reused SMTP session (no handshake/login per email).
+                await self._acknowledge_incidents(classified_incidents)
+                for incident_obj in classified_incidents:
+                    self._log_final_state(incident_obj)
             
-            logger.info(f"[{self.config.agent_name}] === Finished incident check cycle ===")
+            logger.info("[%s] === Finished incident check cycle ===", self.config.agent_name)
 
         except Exception as e:
             # This catches broader errors, e.g., if email_handler.fetch_new_incidents itself fails catastrophically.
             logger.error(
-                f"[{self.config.agent_name}] Critical error occurred during the main check cycle operation: {e}", 
+                "[%s] Critical error occurred during the main check cycle operation: %s",
+                self.config.agent_name, e,
                 exc_info=True
             )
+        return len(newly_fetched_incidents)
+
+    def _next_check_interval(self, incidents_found: int) -> int:
+        """
+        Additive-increase/multiplicative-decrease style adaptation of the polling interval:
+        back off by 1.5x after a quiet cycle, halve it after a cycle that found incidents,
+        always staying within [MinCheckIntervalSeconds, MaxCheckIntervalSeconds].
+        """
+        if incidents_found:
+            return max(self.config.min_check_interval_seconds, self._current_interval // 2)
+        return min(self.config.max_check_interval_seconds, math.ceil(self._current_interval * 1.5))
+
+    async def _wait_for_stop(self, stop_event: asyncio.Event, timeout: float) -> bool:
+        """Sleeps up to `timeout` seconds; returns True if shutdown was requested meanwhile."""
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
 
-    def start_agent(self):
+    async def _run_scheduled_loop(self, stop_event: asyncio.Event):
+        """
+        Polls for incidents, starting every `check_interval_seconds` and adapting the interval
+        to the recent incident rate (see _next_check_interval).
+        The event loop sleeps exactly until the next cycle is due on the monotonic clock
+        (or until a shutdown signal arrives), so wall-clock adjustments do not affect the interval.
+        """
+        next_run = time.monotonic() + self._current_interval
+
+        logger.info("[%s] Polling loop started. Agent is now running. Press Ctrl+C to stop.", self.config.agent_name)
+        while not stop_event.is_set():
+            if await self._wait_for_stop(stop_event, max(0, next_run - time.monotonic())):
+                break # Shutdown requested while sleeping
+
+            incidents_found = await self.run_incident_check_cycle()
+
+            new_interval = self._next_check_interval(incidents_found)
+            if new_interval != self._current_interval:
+                logger.info("[%s] Polling interval changed from %ss to %ss.", self.config.agent_name, self._current_interval, new_interval)
+                self._current_interval = new_interval
+            next_run = time.monotonic() + self._current_interval
+
+    async def _run_idle_loop(self, stop_event: asyncio.Event) -> bool:
+        """
+        Waits for new mail via IMAP IDLE and runs a check cycle as soon as the server reports it.
+        A check cycle also runs whenever IDLE is refreshed, as a safety net for mail that arrived
+        while IDLE was not active.
+
+        Returns:
+            False if the server does not support IDLE (caller should fall back to polling), True otherwise.
+        """
+        logger.info("[%s] IMAP IDLE mode enabled. Agent is now waiting for new mail. Press Ctrl+C to stop.", self.config.agent_name)
+        while not stop_event.is_set():
+            idle_task = asyncio.ensure_future(self._run_blocking(self.email_handler.wait_for_new_mail))
+            stop_task = asyncio.ensure_future(stop_event.wait())
+            done, _ = await asyncio.wait({idle_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+            if stop_task in done:
+                # Wake the worker thread blocked in IDLE so the pool can shut down promptly.
+                self.email_handler.interrupt_idle()
+                await asyncio.gather(idle_task, return_exceptions=True)
+                break
+            stop_task.cancel()
+
+            try:
+                has_new_mail = idle_task.result()
+            except Exception as e:
+                logger.error("[%s] IMAP IDLE connection failed: %s. Retrying in %ss.", self.config.agent_name, e, self.config.check_interval_seconds)
+                if await self._wait_for_stop(stop_event, self.config.check_interval_seconds):
+                    break
+                has_new_mail = False # Fall through to a regular check cycle so nothing is missed during the outage
+
+            if has_new_mail is None:
+                return False
+            if not has_new_mail:
+                logger.debug("[%s] IDLE refresh: running safety check cycle.", self.config.agent_name)
+            await self.run_incident_check_cycle()
+        return True
+
+    async def start_agent(self):
         """
         Starts the agent's main operational loop.
-        It performs an initial check cycle and then schedules periodic checks.
+        It performs an initial check cycle and then either waits for IMAP IDLE push
+        notifications (if `UseIdle` is enabled) or polls periodically.
         """
-        logger.info(f"--- Incident Management Agent '{self.config.agent_name}' is starting up... ---")
-        logger.info(f"Will check for new incidents every {self.config.check_interval_seconds} seconds.")
+        logger.info("--- Incident Management Agent '%s' is starting up... ---", self.config.agent_name)
+        if self.config.use_idle:
+            logger.info("Will check for new incidents when the IMAP server reports new mail (IDLE).")
+        else:
+            logger.info(
+                "Will check for new incidents every %s seconds (adapting between %ss and %ss).",
+                self._current_interval, self.config.min_check_interval_seconds, self.config.max_check_interval_seconds
+            )
 
-        # Perform an initial check cycle immediately upon startup.
-        logger.info(f"[{self.config.agent_name}] Performing initial incident check cycle on startup...")
-        self.run_incident_check_cycle() 
-        
-        # Schedule the periodic execution of the check cycle.
-        schedule.every(self.config.check_interval_seconds).seconds.do(self.run_incident_check_cycle)
+        # Translate SIGINT/SIGTERM into an event so the sleeping loop wakes up immediately.
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                # Signal handlers are not supported on this platform (e.g., Windows); KeyboardInterrupt still applies.
+                pass
 
-        logger.info(f"[{self.config.agent_name}] Scheduler started. Agent is now running. Press Ctrl+C to stop.")
         try:
-            while True:
-                schedule.run_pending() # Execute any pending scheduled jobs
-                time.sleep(1) # Sleep for a short duration to avoid busy-waiting and be responsive to Ctrl+C
-        except KeyboardInterrupt:
-            logger.info(f"[{self.config.agent_name}] Shutdown signal (KeyboardInterrupt) received. Stopping agent...")
+            # Perform an initial check cycle immediately upon startup.
+            logger.info("[%s] Performing initial incident check cycle on startup...", self.config.agent_name)
+            await self.run_incident_check_cycle()
+
+            idle_handled = False
+            if self.config.use_idle:
+                idle_handled = await self._run_idle_loop(stop_event)
+                if not idle_handled:
+                    logger.warning("[%s] IMAP server does not support IDLE. Falling back to polling every %ss.", self.config.agent_name, self.config.check_interval_seconds)
+            if not idle_handled:
+                await self._run_scheduled_loop(stop_event)
+            logger.info("[%s] Shutdown signal received. Stopping agent...", self.config.agent_name)
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            logger.info("[%s] Shutdown signal (KeyboardInterrupt) received. Stopping agent...", self.config.agent_name)
         except Exception as e:
             # Catch any unexpected critical exceptions in the main scheduling loop.
             logger.critical(
-                f"[{self.config.agent_name}] Agent encountered a critical unhandled exception in the main scheduling loop: {e}", 
+                "[%s] Agent encountered a critical unhandled exception in the main scheduling loop: %s",
+                self.config.agent_name, e,
                 exc_info=True
             )
         finally:
-            logger.info(f"--- {self.config.agent_name} Incident Management Agent is shutting down. ---")
+            self.email_handler.interrupt_idle() # In case a worker thread is still blocked in IMAP IDLE
+            self._pool.shutdown(wait=True) # Let in-flight acks/tickets finish before exiting
+            # Close the persistent IMAP and Jira connections reused across cycles.
+            self.email_handler.close()
+            self.jira_handler.close()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.remove_signal_handler(sig)
+                except (NotImplementedError, RuntimeError):
+                    pass
+            logger.info("--- %s Incident Management Agent is shutting down. ---", self.config.agent_name)
 
 # --- Main Execution Block ---
 if __name__ == "__main__":
@@ -189,7 +495,10 @@ if __name__ == "__main__":
     agent_instance = None
     try:
         agent_instance = IncidentManagementAgent() # Instantiate the agent
-        agent_instance.start_agent() # Start its operation
+        asyncio.run(agent_instance.start_agent()) # Start its operation on a fresh event loop
+    except KeyboardInterrupt:
+        # Platforms without loop signal handlers surface Ctrl+C here; start_agent() has already logged shutdown.
+        pass
     except FileNotFoundError:
         # This specific error from ConfigManager (config.ini not found) is critical for startup.
         # Logging might not be fully set up if ConfigManager fails early, so print as well.
@@ -199,7 +508,7 @@ if __name__ == "__main__":
         # Catch any other critical exceptions during agent instantiation or before start_agent() begins its loop.
         print(f"FATAL: Agent failed to initialize or start due to an unhandled critical error: {e}")
         # If logger is available (i.e., basicConfig worked), use it.
-        logger.critical(f"Agent failed to initialize or start: {e}", exc_info=True)
+        logger.critical("Agent failed to initialize or start: %s", e, exc_info=True)
     
     # The `finally` block within `start_agent()` handles normal shutdown logging.
     # If startup fails catastrophically, the script will exit.
\ No newline at end of file
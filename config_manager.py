@@ -1,18 +1,44 @@
 # config_manager.py
 
 import configparser
+import functools
 import os
+import re
+import sys
+import types
 from dotenv import load_dotenv
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, Iterable, Mapping, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Basic shape check for configured email addresses (local@domain.tld); deliverability is not checked.
+_EMAIL_ADDRESS_RE = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+
 class ConfigManager:
     """
     Manages loading and accessing configuration from .env (for secrets)
     and config.ini (for general settings and rules).
     """
+    # Fixed attribute layout (no per-instance __dict__); extend this when adding new settings.
+    __slots__ = (
+        'config', '_ini_path',
+        # General
+        'agent_name', 'check_interval_seconds', 'min_check_interval_seconds', 'max_check_interval_seconds',
+        'async_workers', 'use_idle', 'state_db_path', 'duplicate_window_minutes',
+        # Email
+        'imap_server', 'imap_username', 'imap_password',
+        'smtp_server', 'smtp_port', 'smtp_username', 'smtp_password', 'sender_email',
+        # Jira
+        'jira_url', 'jira_username', 'jira_api_token', 'jira_project_key', 'jira_p1_issue_type', 'jira_max_concurrent',
+        'jira_max_retries', 'jira_connect_timeout', 'jira_read_timeout', 'jira_body_limit',
+        # Teams
+        'team_keywords', 'team_keywords_re', 'team_emails',
+        'default_team_name', 'default_team_email', 'assignable_teams',
+        # Priorities
+        'priority_keywords', 'priority_keywords_re',
+    )
+
     def __init__(self, ini_file_path: str = 'config.ini', env_file_path: Optional[str] = None):
         # Determine .env file path (useful for tests or different environments)
         # If env_file_path is not provided, it defaults to '.env' in the current directory
@@ -22,6 +48,7 @@ class ConfigManager:
         load_dotenv(dotenv_path=dotenv_path) # Load environment variables
 
         self.config = configparser.ConfigParser(interpolation=None) # Disable interpolation
+        self._ini_path = ini_file_path # Kept for log messages
         if not os.path.exists(ini_file_path):
             logger.error(f"Configuration file {ini_file_path} not found.")
             raise FileNotFoundError(f"Configuration file {ini_file_path} not found.")
@@ -31,6 +58,17 @@ class ConfigManager:
         # --- General Settings ---
         self.agent_name: str = self.config.get('General', 'AgentName', fallback='IncidentAgent')
         self.check_interval_seconds: int = self.config.getint('General', 'CheckIntervalSeconds', fallback=60)
+        # Bounds for the adaptive polling interval (both default to CheckIntervalSeconds, i.e. a fixed interval).
+        self.min_check_interval_seconds: int = max(1, self.config.getint('General', 'MinCheckIntervalSeconds', fallback=self.check_interval_seconds))
+        self.max_check_interval_seconds: int = max(self.min_check_interval_seconds, self.config.getint('General', 'MaxCheckIntervalSeconds', fallback=self.check_interval_seconds))
+        # Number of worker threads used to run blocking I/O (SMTP, IMAP, Jira) concurrently per check cycle.
+        self.async_workers: int = max(1, self.config.getint('General', 'AsyncWorkers', fallback=5))
+        # If true, wait for IMAP IDLE push notifications instead of polling every CheckIntervalSeconds (opt-in).
+        self.use_idle: bool = self.config.getboolean('General', 'UseIdle', fallback=False)
+        # SQLite file remembering processed incident IDs across restarts.
+        self.state_db_path: str = self.config.get('General', 'StateDbPath', fallback='state.db')
+        # Reports with the same content as one first seen less than this many minutes ago are dropped as duplicates.
+        self.duplicate_window_minutes: float = max(0.0, self.config.getfloat('General', 'DuplicateWindowMinutes', fallback=30))
 
         # --- Email Credentials (from .env) ---
         self.imap_server: Optional[str] = os.getenv('IMAP_SERVER')
@@ -48,57 +86,113 @@ class ConfigManager:
         self.jira_api_token: Optional[str] = os.getenv('JIRA_API_TOKEN')
         self.jira_project_key: str = self.config.get('Jira', 'ProjectKey', fallback='ITSM')
         self.jira_p1_issue_type: str = self.config.get('Jira', 'P1IssueType', fallback='Incident')
+        # Upper bound on concurrent Jira ticket-creation requests (helps avoid HTTP 429 rate limiting).
+        self.jira_max_concurrent: int = max(1, self.config.getint('Jira', 'MaxConcurrentRequests', fallback=self.async_workers))
+        # Retries of a ticket-creation request that failed transiently (rate limiting, gateway errors, connection errors).
+        self.jira_max_retries: int = max(0, self.config.getint('Jira', 'MaxRetries', fallback=4))
+        # Seconds to wait for a connection to Jira / for Jira to respond, so a hung server cannot pin a worker thread.
+        self.jira_connect_timeout: float = self.config.getfloat('Jira', 'ConnectTimeoutSeconds', fallback=10)
+        self.jira_read_timeout: float = self.config.getfloat('Jira', 'ReadTimeoutSeconds', fallback=120)
+        # Incident bodies longer than this many characters are truncated in the ticket description and attached in full.
+        self.jira_body_limit: int = max(1, self.config.getint('Jira', 'DescriptionBodyLimit', fallback=30000))
 
         # --- Team Mapping Rules (from config.ini) ---
-        # self.team_keywords stores: {'NetworkTeam': ['network', 'firewall', ...], ...}
+        # self.team_keywords stores: {'NetworkTeam': frozenset({'network', 'firewall', ...}), ...}
         # Keys are the team names as defined in [Teams] section (e.g., NetworkTeam)
-        # Values are lists of lowercased keywords.
-        self.team_keywords: Dict[str, List[str]] = self._load_keywords_from_section('Teams')
+        # Values are frozensets of casefolded keywords.
+        self.team_keywords: Dict[str, FrozenSet[str]] = self._load_keywords_from_section('Teams')
+        # One precompiled alternation per team, so matching a team is a single regex scan.
+        self.team_keywords_re: Dict[str, Optional[re.Pattern]] = {
+            team: self._compile_keyword_regex(kws) for team, kws in self.team_keywords.items()
+        }
         
         # self.team_emails stores: {'networkteam': 'network-team@example.com', ...}
-        # Keys are lowercased versions of team names from [Teams] section.
-        self.team_emails: Dict[str, str] = {
-            k.lower(): v for k, v in self.config.items('TeamEmails') if k.lower() != 'defaultteamname'
-        }
+        # Keys are lowercased versions of team names from [Teams] section, interned so lookups with
+        # other interned team names (see assignable_teams below) compare by identity.
+        # Exposed as a read-only view; it is built once here and never mutated afterwards.
+        self.team_emails: Mapping[str, str] = types.MappingProxyType({
+            sys.intern(k.lower()): v for k, v in self.config.items('TeamEmails') if k.lower() != 'defaultteamname'
+        })
 
         # Default team configuration
         self.default_team_name: str = self.config.get('TeamEmails', 'DefaultTeamName', fallback='DefaultTeam')
         # The key for the default team's email in [TeamEmails] section is its name in lowercase.
-        self.default_team_email: str = self.team_emails.get(
-            self.default_team_name.lower(), # Lookup using lowercase name
-            'support@example.com' # Fallback if default team email not found
-        )
-        if not self.team_emails.get(self.default_team_name.lower()):
-            logger.warning(f"Default team email for '{self.default_team_name}' (key: '{self.default_team_name.lower()}') not found in [TeamEmails]. Using fallback 'support@example.com'.")
+        # Resolved once here; callers use `default_team_email` rather than looking it up again.
+        default_team_key = self.default_team_name.lower() # Lookup using lowercase name
+        configured_default_email = self.team_emails.get(default_team_key)
+        self.default_team_email: str = configured_default_email or 'support@example.com' # Fallback if default team email not found
+        if not configured_default_email:
+            logger.warning(f"Default team email for '{self.default_team_name}' (key: '{default_team_key}') not found in [TeamEmails]. Using fallback 'support@example.com'.")
+
+        # self.assignable_teams stores: {'networkteam': 'network-team@example.com', ...} in [Teams] order,
+        # i.e. the keyword-matched teams an incident can actually be assigned to. A team without an email
+        # is reported once here instead of on every incident that matches its keywords.
+        assignable_teams: Dict[str, str] = {}
+        for team_name in self.team_keywords:
+            team_email = self.team_emails.get(sys.intern(team_name.lower()))
+            if team_email:
+                assignable_teams[team_name] = team_email
+            else:
+                logger.warning(f"Team '{team_name}' in [Teams] has no email in [TeamEmails]. Incidents matching its keywords will be assigned to another matching team or the default team.")
+        self.assignable_teams: Mapping[str, str] = types.MappingProxyType(assignable_teams)
 
 
         # --- Priority Classification Rules (from config.ini) ---
-        # self.priority_keywords stores: {'P1': ['critical', ...], 'P2': ['high', ...], ...}
-        # Values are lists of lowercased keywords.
-        self.priority_keywords: Dict[str, List[str]] = {
-            p_level: self._parse_keywords_string(self.config.get('PriorityKeywords', p_level, fallback=''))
+        # self.priority_keywords stores: {'P1': frozenset({'critical', ...}), 'P2': frozenset({'high', ...}), ...}
+        # Values are frozensets of casefolded keywords.
+        # Walk the section once; configparser stores option names lowercased (e.g., 'p1').
+        raw_priority_keywords = dict(self.config.items('PriorityKeywords')) if self.config.has_section('PriorityKeywords') else {}
+        self.priority_keywords: Dict[str, FrozenSet[str]] = {
+            p_level: self._parse_keywords_string(raw_priority_keywords.get(p_level.lower(), ''))
             for p_level in ["P1", "P2", "P3", "P4"] # Ensure specific order for processing later
         }
+        self.priority_keywords_re: Dict[str, Optional[re.Pattern]] = {
+            p_level: self._compile_keyword_regex(kws) for p_level, kws in self.priority_keywords.items()
+        }
         
         self._validate_essential_configs()
 
-    def _parse_keywords_string(self, keyword_string: str) -> List[str]:
-        """Helper to parse a comma-separated string of keywords into a list of lowercased strings."""
-        return [kw.strip().lower() for kw in keyword_string.split(',') if kw.strip()]
+    @classmethod
+    def invalidate(cls):
+        """
+        Drops the cached instances returned by `get_config()`, so the next call re-reads
+        `.env` and `config.ini` (e.g., for a SIGHUP-style configuration reload).
+        """
+        get_config.cache_clear()
+        logger.info("Configuration cache invalidated. Configuration will be reloaded on next access.")
+
+    def _parse_keywords_string(self, keyword_string: str) -> FrozenSet[str]:
+        """
+        Helper to parse a comma-separated string of keywords into a frozenset of casefolded strings
+        (casefolded like `Incident.search_text`, so e.g. 'ß' matches 'ss').
+        """
+        return frozenset(kw.strip().casefold() for kw in keyword_string.split(',') if kw.strip())
+
+    def _compile_keyword_regex(self, keywords: Iterable[str]) -> Optional[re.Pattern]:
+        """
+        Helper to compile keywords into a single whole-word alternation regex.
+        Longer keywords are tried first so multi-word phrases win over their prefixes.
+        Word boundaries follow Unicode word characters (so "down" does not match inside "ádown").
+        Returns None if there are no keywords (an empty alternation would match everything).
+        """
+        ordered = sorted(keywords, key=lambda kw: (-len(kw), kw))
+        if not ordered:
+            return None
+        return re.compile(r'\b(' + '|'.join(map(re.escape, ordered)) + r')\b')
 
-    def _load_keywords_from_section(self, section_name: str) -> Dict[str, List[str]]:
+    def _load_keywords_from_section(self, section_name: str) -> Dict[str, FrozenSet[str]]:
         """
         Helper to load sections where keys are item names (e.g., Team Names)
         and values are comma-separated lists of keywords.
-        Keywords are lowercased. Keys (team names) are preserved as in config.ini.
-        Example: {'NetworkTeam': ['network', 'firewall'], ...}
+        Keywords are casefolded. Keys (team names) are preserved as in config.ini and interned.
+        Example: {'NetworkTeam': frozenset({'network', 'firewall'}), ...}
         """
         data_dict = {}
         if self.config.has_section(section_name):
             for item_key, keywords_str in self.config.items(section_name):
-                data_dict[item_key] = self._parse_keywords_string(keywords_str)
+                data_dict[sys.intern(item_key)] = self._parse_keywords_string(keywords_str)
         else:
-            logger.warning(f"Configuration section [{section_name}] not found in {self.config.read_file}.")
+            logger.warning("Configuration section [%s] not found in %s.", section_name, self._ini_path)
         return data_dict
         
     def _validate_essential_configs(self):
@@ -118,4 +212,17 @@ class ConfigManager:
         if not self.team_keywords:
             logger.warning("No team keywords defined in [Teams] section of config.ini. Team assignment might always go to default.")
         if not self.priority_keywords.get("P1") and not self.priority_keywords.get("P2"): # Example check
-            logger.warning("No P1 or P2 priority keywords defined in [PriorityKeywords] section. Priority classification might be ineffective.")
\ No newline at end of file
+            logger.warning("No P1 or P2 priority keywords defined in [PriorityKeywords] section. Priority classification might be ineffective.")
+        # Team emails are validated once here rather than on every incident they are assigned to.
+        for team_key, team_email in self.team_emails.items():
+            if not _EMAIL_ADDRESS_RE.fullmatch(team_email):
+                logger.warning(f"Email '{team_email}' for team key '{team_key}' in [TeamEmails] does not look like a valid address. Acknowledgements to it may fail.")
+
+
+@functools.lru_cache(maxsize=None)
+def get_config(ini_file_path: str = 'config.ini', env_file_path: Optional[str] = None) -> ConfigManager:
+    """
+    Returns a shared ConfigManager for the given file paths, parsing `.env`/`config.ini` only once
+    per distinct set of arguments. Use `ConfigManager.invalidate()` to force a reload.
+    """
+    return ConfigManager(ini_file_path, env_file_path)
\ No newline at end of file
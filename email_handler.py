@@ -1,18 +1,71 @@
 # email_handler.py
 
 import imaplib
+import itertools
+import select # For waiting on the IMAP IDLE socket
 import smtplib
+import socket # For the IDLE wake-up socket pair
+import threading
+import time
 import email # For email.message.Message and email.utils
+from concurrent.futures import ThreadPoolExecutor # Parses a fetched chunk of emails concurrently
 from email.mime.text import MIMEText
-from typing import List, Optional, Set
+from typing import Dict, List, Optional
 import logging
+import re
 
 from config_manager import ConfigManager
 from incident_parser import IncidentParser # Assuming IncidentParser is in incident_parser.py
+from incident_store import ProcessedIncidentStore
 from models import Incident # Assuming Incident model is in models.py
 
 logger = logging.getLogger(__name__)
 
+# Leading message (sequence) number of a FETCH response line, e.g. b'12 (UID 345 RFC822 {3456}'
+_FETCH_MSG_ID_RE = re.compile(rb'^(\d+)\s')
+# UID data item of a UID FETCH response; servers may place it before or after the literals.
+_FETCH_UID_RE = re.compile(rb'\bUID (\d+)')
+# Result set of an ESEARCH response (RFC 4731), e.g. b'(TAG "A5") UID ALL 4:7,10'
+_ESEARCH_ALL_RE = re.compile(rb'\bALL (\S+)')
+
+# Triage fetches download the headers plus at most this many leading bytes of the body. The text part
+# normally comes first in a MIME message, so large attachments after it are not transferred.
+# Emails cut at this limit are flagged (Incident.body_truncated): classification and duplicate detection
+# use the prefix, and P1 incidents are fetched again in full before their ticket is created (fetch_full_bodies).
+TRIAGE_BODY_BYTES = 64 * 1024
+# BODY.PEEK (unlike BODY) does not set \Seen implicitly; messages are flagged explicitly after handling.
+_TRIAGE_FETCH_SPEC = f"(BODY.PEEK[HEADER] BODY.PEEK[TEXT]<0.{TRIAGE_BODY_BYTES}>)"
+_FULL_FETCH_SPEC = "(BODY.PEEK[HEADER] BODY.PEEK[TEXT])"
+
+# Messages per bulk FETCH/STORE command; keeps command lines well under common server limits.
+FETCH_BATCH_SIZE = 100
+
+try:
+    from itertools import batched as _batched # Python 3.12+
+except ImportError:
+    def _batched(iterable, n):
+        """Yields successive tuples of up to `n` items (itertools.batched recipe for older Pythons)."""
+        iterator = iter(iterable)
+        while True:
+            batch = tuple(itertools.islice(iterator, n))
+            if not batch:
+                return
+            yield batch
+
+# Worker threads used to parse the emails of one fetched chunk concurrently.
+PARSE_WORKERS = 8
+
+# Servers drop IDLE sessions after ~30 minutes (RFC 2177), so IDLE is re-issued comfortably before that.
+IDLE_REFRESH_SECONDS = 28 * 60
+# How long to wait for the server to answer IDLE or DONE before treating the IDLE connection as broken.
+IDLE_RESPONSE_TIMEOUT_SECONDS = 30
+# A persistent connection unused for longer than this is replaced rather than probed, since
+# servers commonly drop inactive sessions around the 30-minute mark.
+IMAP_MAX_IDLE_SECONDS = 25 * 60
+# SMTP servers typically close idle sessions after ~5 minutes (RFC 5321 section 4.5.3.2.7), so a cached
+# SMTP connection unused for longer than this is replaced instead of being tried first.
+SMTP_MAX_IDLE_SECONDS = 4 * 60
+
 class EmailHandler:
     """
     Handles fetching new emails (potential incidents) from an IMAP server
@@ -21,12 +74,28 @@ class EmailHandler:
     def __init__(self, config: ConfigManager, parser: IncidentParser):
         self.config = config
         self.parser = parser
-        # This set stores unique Incident IDs (Message-ID or fallback) of emails
-        # that have been fetched AND successfully parsed into an Incident object OR
-        # determined to be irrelevant by the parser.
-        # For a production system, this should be a persistent store (DB, file)
-        # to avoid reprocessing emails if the agent restarts and IMAP 'SEEN' flags are lost/reset.
-        self.processed_incident_ids: Set[str] = set()
+        # This store holds unique Incident IDs (Message-ID or fallback) of emails
+        # that have been fetched AND successfully parsed into an Incident object.
+        # It is persisted (SQLite, fronted by a Bloom filter) to avoid reprocessing emails
+        # if the agent restarts and IMAP 'SEEN' flags are lost/reset.
+        self.processed_incident_ids = ProcessedIncidentStore(self.config.state_db_path)
+        # Long-lived IMAP connection reused across fetch cycles (avoids TCP+TLS+LOGIN on every poll).
+        self._imap: Optional[imaplib.IMAP4_SSL] = None
+        self._imap_last_used: float = 0.0 # time.monotonic() of the last command sent on self._imap
+        # Dedicated long-lived connection used only for IMAP IDLE (push notifications).
+        self._idle_conn: Optional[imaplib.IMAP4_SSL] = None
+        # Bytes received on the IDLE connection but not yet consumed as lines. IDLE responses are read from
+        # the socket directly (not through imaplib's buffered reader, whose buffer select() cannot see).
+        self._idle_buffer = bytearray()
+        self._idle_tags = itertools.count(1) # Tags of our own IDLE commands (IDLE1, IDLE2, ...)
+        # Long-lived SMTP connection reused across acknowledgements (avoids EHLO+STARTTLS+LOGIN per email).
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_last_used: float = 0.0 # time.monotonic() of the last command sent on self._smtp
+        self._smtp_lock = threading.Lock() # One SMTP session cannot carry concurrent transactions
+        # Parses fetched emails concurrently; deduplication and \\Seen flagging stay on the fetching thread.
+        self._parse_pool = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="email-parse")
+        # Socket pair used to wake a thread blocked in IDLE (e.g., on shutdown).
+        self._idle_wakeup_r, self._idle_wakeup_w = socket.socketpair()
 
     def _connect_imap(self) -> Optional[imaplib.IMAP4_SSL]:
         """Connects to the IMAP server and selects the inbox."""
@@ -51,99 +120,592 @@ class EmailHandler:
             logger.error(f"Unexpected error connecting to IMAP server: {e}", exc_info=True)
             return None
 
-    def fetch_new_incidents_from_email(self) -> List[Incident]:
+    def ensure_connected(self) -> Optional[imaplib.IMAP4_SSL]:
+        """
+        Returns the persistent IMAP connection, (re)connecting only if there is none, it is no
+        longer in the SELECTED state, it has been unused for over IMAP_MAX_IDLE_SECONDS, or it
+        does not answer a NOOP. Returns None if connecting fails.
+        """
+        if self._imap is not None:
+            idle_seconds = time.monotonic() - self._imap_last_used
+            if self._imap.state != 'SELECTED':
+                logger.info(f"IMAP connection is in state '{self._imap.state}'. Reconnecting.")
+                self._drop_imap_connection()
+            elif idle_seconds > IMAP_MAX_IDLE_SECONDS:
+                logger.info(f"IMAP connection unused for {idle_seconds:.0f}s; the server has likely dropped it. Reconnecting.")
+                self._drop_imap_connection()
+            else:
+                try:
+                    if self._imap.noop()[0] == 'OK':
+                        self._imap_last_used = time.monotonic()
+                        return self._imap
+                    logger.info("IMAP NOOP failed on the persistent connection. Reconnecting.")
+                except (imaplib.IMAP4.error, OSError) as e:
+                    logger.info(f"IMAP connection is no longer usable ({e}). Reconnecting.")
+                self._drop_imap_connection()
+        self._imap = self._connect_imap()
+        self._imap_last_used = time.monotonic()
+        return self._imap
+
+    def _drop_imap_connection(self):
+        """Logs out and forgets the persistent IMAP connection, ignoring errors on a broken socket."""
+        if self._imap is None:
+            return
+        try:
+            self._imap.logout()
+            logger.debug("IMAP connection logged out.")
+        except Exception as e:
+            logger.debug(f"Error logging out IMAP connection: {e}")
+        self._imap = None
+
+    def _connect_smtp(self) -> smtplib.SMTP:
+        """Opens an authenticated SMTP session. Raises smtplib.SMTPException or OSError on failure."""
+        logger.debug(f"Connecting to SMTP server: {self.config.smtp_server}:{self.config.smtp_port}")
+        server = smtplib.SMTP(self.config.smtp_server, self.config.smtp_port)
+        try:
+            # starttls() and login() each send EHLO themselves when needed (including the
+            # required re-EHLO after the TLS upgrade), so no explicit ehlo() calls are made.
+            server.starttls() # Enable TLS encryption
+            server.login(self.config.smtp_username, self.config.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        logger.debug("Successfully connected and logged in to SMTP server.")
+        return server
+
+    def _get_smtp(self) -> smtplib.SMTP:
+        """
+        Returns the persistent SMTP connection, reconnecting if there is none or it has been unused
+        for over SMTP_MAX_IDLE_SECONDS. Must be called with self._smtp_lock held.
+        """
+        if self._smtp is not None and time.monotonic() - self._smtp_last_used > SMTP_MAX_IDLE_SECONDS:
+            logger.debug("SMTP connection unused for too long; the server has likely dropped it. Reconnecting.")
+            self._drop_smtp_connection()
+        if self._smtp is None:
+            self._smtp = self._connect_smtp()
+        self._smtp_last_used = time.monotonic()
+        return self._smtp
+
+    def _drop_smtp_connection(self):
+        """Quits and forgets the persistent SMTP connection, ignoring errors on a broken socket."""
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+            logger.debug("SMTP connection closed.")
+        except Exception as e:
+            logger.debug(f"Error closing SMTP connection: {e}")
+            self._smtp.close()
+        self._smtp = None
+
+    def _send_via_smtp(self, recipient_email: str, msg: MIMEText):
+        """
+        Sends one message over the persistent SMTP connection. If the server has dropped the
+        session, reconnects once and retries the message.
+        """
+        with self._smtp_lock:
+            try:
+                self._get_smtp().sendmail(self.config.sender_email, [recipient_email], msg.as_string())
+            except smtplib.SMTPServerDisconnected as e:
+                logger.info(f"SMTP connection was closed by the server ({e}). Reconnecting.")
+                self._smtp = None # Socket is already closed; nothing to QUIT
+                self._get_smtp().sendmail(self.config.sender_email, [recipient_email], msg.as_string())
+            except smtplib.SMTPException:
+                raise # Protocol-level rejection (e.g., refused recipient); the session is still usable
+            except OSError:
+                # Socket-level failure mid-transaction: the session state is unknown, so discard it.
+                if self._smtp is not None:
+                    self._smtp.close()
+                    self._smtp = None
+                raise
+
+    def close(self):
+        """Closes all IMAP/SMTP connections, the parse pool and the processed-ID store. Called on agent shutdown."""
+        with self._smtp_lock:
+            self._drop_smtp_connection()
+        self._drop_imap_connection()
+        self._close_idle_connection()
+        self._idle_wakeup_r.close()
+        self._idle_wakeup_w.close()
+        self._parse_pool.shutdown(wait=True)
+        self.processed_incident_ids.close()
+
+    @staticmethod
+    def _extract_fetch_payloads(msg_data: list) -> Dict[bytes, List[bytes]]:
+        """
+        Maps message UIDs to the literal(s) of each message in an IMAP UID FETCH response, in order.
+        imaplib returns e.g. [(b'1 (UID 7 RFC822 {N}', b'raw...'), b')', ...] for RFC822, or
+        [(b'1 (UID 7 BODY[HEADER] {N}', b'hdr...'), (b' BODY[TEXT]<0> {M}', b'text...'), b')', ...]
+        for triage fetches. Some servers report the UID after the literals instead (b' UID 7)').
+        Messages whose response carries no UID are left out.
+        """
+        payloads: Dict[bytes, List[bytes]] = {}
+        current_uid: Optional[bytes] = None
+        current_parts: Optional[List[bytes]] = None
+        for response_part in msg_data:
+            if isinstance(response_part, tuple):
+                prefix, literal = response_part
+                if _FETCH_MSG_ID_RE.match(prefix): # Start of the next message's response
+                    current_uid, current_parts = None, []
+            else:
+                prefix, literal = response_part, None
+            if current_parts is None:
+                continue # E.g., an unsolicited FETCH (flag update) without literals
+            uid_match = _FETCH_UID_RE.search(prefix)
+            if uid_match:
+                current_uid = uid_match.group(1)
+            if literal is not None:
+                current_parts.append(literal)
+            else: # b')' (or b' UID 7)') closes the current message's response
+                if current_uid is not None and current_parts:
+                    payloads.setdefault(current_uid, current_parts)
+                current_uid, current_parts = None, None
+        return payloads
+
+    @staticmethod
+    def _uid_set(uids: List[bytes]) -> bytes:
+        """Encodes UIDs as a compact IMAP sequence set, collapsing consecutive runs (e.g. b'4:7,10')."""
+        ranges: List[bytes] = []
+        numbers = sorted(int(uid) for uid in uids)
+        start = prev = numbers[0]
+        for number in itertools.chain(numbers[1:], [None]):
+            if number is not None and number == prev + 1:
+                prev = number
+                continue
+            ranges.append(b'%d' % start if start == prev else b'%d:%d' % (start, prev))
+            if number is not None:
+                start = prev = number
+        return b','.join(ranges)
+
+    @staticmethod
+    def _expand_uid_set(uid_set: bytes) -> List[bytes]:
+        """Expands an IMAP sequence set such as b'4:7,10' (as returned by ESEARCH) into individual UIDs."""
+        uids: List[bytes] = []
+        for item in uid_set.split(b','):
+            first, _, last = item.partition(b':')
+            if last:
+                low, high = sorted((int(first), int(last)))
+                uids.extend(b'%d' % number for number in range(low, high + 1))
+            else:
+                uids.append(first)
+        return uids
+
+    def _handle_raw_email(self, imap_msg_uid_bytes: bytes, payload_parts: List[bytes], new_incidents: List[Incident]):
+        """
+        Parses one fetched email and records it if it is a new incident.
+        The caller marks it as seen (see _mark_seen), regardless of the outcome.
+        """
+        incident = self._parse_payload_or_none(imap_msg_uid_bytes, payload_parts)
+        self._record_incident(imap_msg_uid_bytes, incident, new_incidents)
+
+    def _parse_payload_or_none(self, imap_msg_uid_bytes: bytes, payload_parts: List[bytes]) -> Optional[Incident]:
+        """
+        `_parse_payload` that logs an unexpected error and returns None (an unprocessable email) instead of
+        raising, so one bad email does not stop the others of its chunk from being recorded and marked seen.
+        """
+        try:
+            return self._parse_payload(imap_msg_uid_bytes, payload_parts)
+        except Exception as e:
+            logger.error(f"Unexpected error parsing email IMAP UID {imap_msg_uid_bytes.decode()}: {e}", exc_info=True)
+            return None
+
+    def _parse_payload(self, imap_msg_uid_bytes: bytes, payload_parts: List[bytes]) -> Optional[Incident]:
+        """
+        Parses one fetched email into an Incident (None if irrelevant or unparsable).
+        `payload_parts` is either [full RFC822 bytes] or [header bytes, (truncated) body bytes].
+        Touches no handler state, so it is safe to run in the parse pool.
+        """
+        imap_msg_uid_str = imap_msg_uid_bytes.decode() # For logging and internal use
+
+        # Attempt to parse the email into an Incident object
+        if len(payload_parts) >= 2:
+            incident = self.parser.parse_parts_to_incident(
+                imap_msg_uid=imap_msg_uid_str,
+                headers_bytes=payload_parts[0],
+                text_bytes=payload_parts[1],
+                agent_sender_email=self.config.sender_email # To avoid self-loops
+            )
+        else:
+            incident = self.parser.parse_email_to_incident(
+                imap_msg_uid=imap_msg_uid_str,
+                raw_email_bytes=payload_parts[0],
+                agent_sender_email=self.config.sender_email # To avoid self-loops
+            )
+        if incident:
+            incident.imap_uid = imap_msg_uid_str
+            # A body of exactly TRIAGE_BODY_BYTES may be complete; it is flagged anyway, as the size is not known.
+            if len(payload_parts) >= 2 and len(payload_parts[1]) >= TRIAGE_BODY_BYTES:
+                incident.body_truncated = True
+                incident.add_note(f"Only the first {TRIAGE_BODY_BYTES // 1024} KB of the email body were fetched; priority, team and duplicate detection used that part.")
+        return incident
+
+    def _record_incident(self, imap_msg_uid_bytes: bytes, incident: Optional[Incident], new_incidents: List[Incident]):
+        """Adds a parsed incident to `new_incidents` unless it was already processed (fetching thread only)."""
+        imap_msg_uid_str = imap_msg_uid_bytes.decode()
+        if incident: # Successfully parsed into a potential incident
+            if incident.id in self.processed_incident_ids:
+                logger.info(f"Skipping already processed incident (ID: {incident.id}, IMAP UID: {imap_msg_uid_str}). Marking as seen.")
+            else:
+                new_incidents.append(incident)
+                self.processed_incident_ids.add(incident.id) # Add unique Incident ID
+                logger.info(f"Successfully parsed new incident (ID: {incident.id}) from IMAP UID {imap_msg_uid_str}.")
+        else: # Parser returned None (e.g., auto-reply, parsing error, or self-sent)
+            # The parser logs why it skipped. We just note it was handled.
+            logger.info(f"Parser determined email IMAP UID {imap_msg_uid_str} is not a processable incident or failed parsing.")
+            # Add a placeholder to processed_ids if Message-ID could be extracted even for non-incidents
+            # to prevent re-parsing errors. For now, we rely on parser to return Incident object.
+
+    def _mark_seen(self, mail_server: imaplib.IMAP4_SSL, imap_msg_uids: List[bytes]):
+        """
+        Marks handled emails as seen with a single STORE over the message set, regardless of whether
+        they were valid incidents or not, to prevent them from being fetched again by "UNSEEN" search.
+        For production, consider moving processed/irrelevant emails to a specific folder.
+        """
+        if not imap_msg_uids:
+            return
+        mail_server.uid('STORE', self._uid_set(imap_msg_uids), '+FLAGS', '\\Seen')
+        logger.debug(f"Marked {len(imap_msg_uids)} IMAP message(s) as \\Seen.")
+
+    def _fetch_one_by_one(
+        self, mail_server: imaplib.IMAP4_SSL, email_imap_uids: List[bytes], new_incidents: List[Incident]
+    ):
+        """Fetches and handles each full message (RFC822) with its own FETCH round-trip (fallback path)."""
+        for imap_msg_uid_bytes in email_imap_uids:
+            imap_msg_uid_str = imap_msg_uid_bytes.decode()
+            
+            # Fetch the full email (RFC822) by UID
+            status, msg_data = mail_server.uid('FETCH', imap_msg_uid_bytes, "(RFC822)")
+            
+            if status == "OK":
+                # msg_data is a list, typically with one item for the fetched email
+                payloads = self._extract_fetch_payloads(msg_data)
+                payload_parts = payloads.get(imap_msg_uid_bytes) or next(iter(payloads.values()), None)
+
+                if payload_parts:
+                    self._handle_raw_email(imap_msg_uid_bytes, payload_parts, new_incidents)
+                    self._mark_seen(mail_server, [imap_msg_uid_bytes])
+                else:
+                    logger.warning(f"Could not retrieve RFC822 content for IMAP UID {imap_msg_uid_str}, though fetch status was OK.")
+            else:
+                logger.error(f"Failed to fetch email content for IMAP UID {imap_msg_uid_str}. Status: {status}")
+
+    def _fetch_bulk(
+        self, mail_server: imaplib.IMAP4_SSL, email_imap_uids: List[bytes], new_incidents: List[Incident]
+    ):
+        """
+        Fetches messages with one UID FETCH (and one \\Seen UID STORE) per chunk of FETCH_BATCH_SIZE
+        messages over a compact UID set, turning N round-trips into N/100.
+        """
+        for chunk in _batched(email_imap_uids, FETCH_BATCH_SIZE):
+            self._fetch_chunk(mail_server, list(chunk), new_incidents)
+
+    def _fetch_chunk(
+        self, mail_server: imaplib.IMAP4_SSL, chunk_uids: List[bytes], new_incidents: List[Incident]
+    ):
+        """
+        Fetches one chunk of messages with a single triage FETCH (headers plus the first
+        TRIAGE_BODY_BYTES of the body, so attachments are mostly skipped). If the server rejects the request
+        (e.g., "maximum request size exceeded"), the chunk is halved and retried down to single
+        messages. Messages missing from the response are retried one by one.
+        """
+        try:
+            status, msg_data = mail_server.uid('FETCH', self._uid_set(chunk_uids), _TRIAGE_FETCH_SPEC)
+        except imaplib.IMAP4.abort:
+            raise # Connection lost; handled by the caller
+        except imaplib.IMAP4.error as e: # Tagged BAD response
+            status, msg_data = "BAD", [str(e).encode()]
+        if status != "OK":
+            if len(chunk_uids) > 1:
+                half = len(chunk_uids) // 2
+                logger.warning(f"Bulk IMAP FETCH of {len(chunk_uids)} message(s) failed with status: {status} ({msg_data}). Retrying in halves.")
+                self._fetch_chunk(mail_server, chunk_uids[:half], new_incidents)
+                self._fetch_chunk(mail_server, chunk_uids[half:], new_incidents)
+            else:
+                logger.error(f"Failed to fetch email content for IMAP UID {chunk_uids[0].decode()}. Status: {status}")
+            return
+
+        payloads = self._extract_fetch_payloads(msg_data)
+        handled_uids = [uid for uid in chunk_uids if payloads.get(uid)]
+        missing_uids = [uid for uid in chunk_uids if not payloads.get(uid)]
+
+        # Parse the chunk concurrently; results come back in message order for deduplication.
+        handled_payloads = [payloads[uid] for uid in handled_uids]
+        if len(handled_uids) > 1:
+            incidents = self._parse_pool.map(self._parse_payload_or_none, handled_uids, handled_payloads)
+        else:
+            incidents = map(self._parse_payload_or_none, handled_uids, handled_payloads)
+        recorded_uids: List[bytes] = []
+        try:
+            for imap_msg_uid_bytes, incident in zip(handled_uids, incidents):
+                self._record_incident(imap_msg_uid_bytes, incident, new_incidents)
+                recorded_uids.append(imap_msg_uid_bytes)
+        finally:
+            # Even if recording fails part-way, the emails recorded so far are not fetched again.
+            self._mark_seen(mail_server, recorded_uids)
+
+        if missing_uids:
+            logger.warning(f"Bulk IMAP FETCH response lacked {len(missing_uids)} message(s). Retrying them one by one.")
+            self._fetch_one_by_one(mail_server, missing_uids, new_incidents)
+
+    def fetch_new_incidents_from_email(self, bulk: bool = True) -> List[Incident]:
         """
         Fetches new, unread emails from the inbox, parses them into Incident objects.
         Marks successfully processed or irrelevant emails as 'Seen' on the IMAP server.
         Uses `processed_incident_ids` for deduplication based on Message-ID if available.
+
+        Args:
+            bulk: If True (default), fetch all unread messages with one FETCH command;
+                  otherwise issue one FETCH per message.
         """
         new_incidents: List[Incident] = []
-        mail_server = self._connect_imap()
+        # A connection the server dropped since the last NOOP is replaced once and the fetch retried;
+        # messages already handled were marked \Seen, so the retried UNSEEN search skips them.
+        for attempt in range(2):
+            mail_server = self.ensure_connected()
+            if not mail_server:
+                return new_incidents # Return empty list if connection failed
+
+            try:
+                self._fetch_unseen(mail_server, bulk, new_incidents)
+            except (imaplib.IMAP4.abort, OSError) as e:
+                self._drop_imap_connection()
+                if attempt == 0:
+                    logger.warning(f"IMAP connection lost during email fetching ({e}). Reconnecting and retrying once.")
+                    continue
+                logger.error(f"IMAP connection lost again during email fetching: {e}", exc_info=True)
+            except imaplib.IMAP4.error as e:
+                logger.error(f"IMAP operation error during email fetching: {e}", exc_info=True)
+                # The connection may be unusable; reconnect on the next cycle.
+                self._drop_imap_connection()
+            except Exception as e:
+                logger.error(f"Unexpected error fetching or processing emails: {e}", exc_info=True)
+            break
+        # The connection is intentionally kept open for the next cycle; see close().
+        self.processed_incident_ids.flush() # Persist this cycle's new IDs in one transaction
+        
+        return new_incidents
+
+    def _fetch_unseen(self, mail_server: imaplib.IMAP4_SSL, bulk: bool, new_incidents: List[Incident]):
+        """Searches the selected mailbox for UNSEEN messages and handles each of them."""
+        # Search for all unseen emails by UID (stable across EXPUNGE and concurrent deliveries).
+        # Other criteria can be used, e.g., 'NEW' (unread since last select), 'SINCE "01-Jan-2023"'
+        email_imap_uids = self._search_unseen_uids(mail_server)
+        self._imap_last_used = time.monotonic()
+        if email_imap_uids is None:
+            return
+        if not email_imap_uids:
+            logger.info("No new unread emails found in this cycle (based on UNSEEN).")
+            return
+        
+        logger.info(f"Found {len(email_imap_uids)} new unread email(s) by IMAP UID based on UNSEEN search.")
+
+        if bulk:
+            self._fetch_bulk(mail_server, email_imap_uids, new_incidents)
+        else:
+            self._fetch_one_by_one(mail_server, email_imap_uids, new_incidents)
+        
+        # If using move+delete for processed emails:
+        # if mail_server.select('inbox')[0] == 'OK': # ensure inbox is still selected
+        #    mail_server.expunge()
+        #    logger.info("Expunged emails marked for deletion from inbox.")
+
+    def _search_unseen_uids(self, mail_server: imaplib.IMAP4_SSL) -> Optional[List[bytes]]:
+        """
+        Returns the UIDs of all UNSEEN messages (None if the search failed). Servers advertising
+        ESEARCH (RFC 4731) are asked for a compact result set (e.g. 4:7,10) instead of one UID per message.
+        """
+        if 'ESEARCH' in mail_server.capabilities:
+            try:
+                status, _ = mail_server.uid('SEARCH', 'RETURN', '(ALL)', 'UNSEEN')
+            except imaplib.IMAP4.abort:
+                raise # Connection lost; handled by the caller
+            except imaplib.IMAP4.error as e: # Tagged BAD response
+                status = f"BAD ({e})"
+            if status == "OK":
+                _, esearch_data = mail_server.response('ESEARCH')
+                match = _ESEARCH_ALL_RE.search(b' '.join(d for d in esearch_data if d))
+                return self._expand_uid_set(match.group(1)) if match else [] # No ALL item: no matches
+            logger.warning(f"IMAP UID SEARCH RETURN (ALL) failed with status: {status}. Retrying with plain UID SEARCH.")
+
+        status, message_uids_bytes = mail_server.uid('SEARCH', None, "UNSEEN")
+        if status != "OK":
+            logger.error(f"IMAP search for UNSEEN emails failed with status: {status}")
+            return None
+        return message_uids_bytes[0].split() if message_uids_bytes and message_uids_bytes[0] else []
+
+    def fetch_full_bodies(self, incidents: List[Incident]):
+        """
+        Fetches the complete body of incidents whose triage fetch was cut at TRIAGE_BODY_BYTES (see
+        Incident.body_truncated), e.g. so a P1 ticket carries the whole email. Incidents whose email cannot
+        be fetched again (e.g., it was deleted meanwhile) keep the truncated body and stay flagged.
+        """
+        truncated = {incident.imap_uid.encode(): incident for incident in incidents if incident.body_truncated and incident.imap_uid}
+        if not truncated:
+            return
+        mail_server = self.ensure_connected()
         if not mail_server:
-            return new_incidents # Return empty list if connection failed
+            return
+        try:
+            for chunk in _batched(list(truncated), FETCH_BATCH_SIZE):
+                status, msg_data = mail_server.uid('FETCH', self._uid_set(list(chunk)), _FULL_FETCH_SPEC)
+                self._imap_last_used = time.monotonic()
+                if status != "OK":
+                    logger.warning(f"IMAP FETCH of {len(chunk)} complete email(s) failed with status: {status}")
+                    continue
+                for imap_msg_uid_bytes, payload_parts in self._extract_fetch_payloads(msg_data).items():
+                    incident = truncated.get(imap_msg_uid_bytes)
+                    if incident is None or len(payload_parts) < 2:
+                        continue
+                    full = self.parser.parse_parts_to_incident(
+                        imap_msg_uid=incident.imap_uid,
+                        headers_bytes=payload_parts[0],
+                        text_bytes=payload_parts[1],
+                        agent_sender_email=self.config.sender_email
+                    )
+                    if full:
+                        incident.replace_content(full.body, full.raw_content)
+                        incident.add_note(f"Fetched the complete email body ({len(payload_parts[1])} bytes).")
+        except (imaplib.IMAP4.abort, OSError) as e:
+            self._drop_imap_connection()
+            logger.warning(f"IMAP connection lost while fetching complete email bodies: {e}")
+        except imaplib.IMAP4.error as e:
+            logger.warning(f"IMAP error while fetching complete email bodies: {e}")
+        for incident in truncated.values():
+            if incident.body_truncated:
+                incident.add_note("The complete email body could not be fetched; only its first part is available.")
+                logger.warning(f"Incident {incident.id}: complete email body could not be fetched (IMAP UID {incident.imap_uid}).")
+
+    def wait_for_new_mail(self, timeout: float = IDLE_REFRESH_SECONDS) -> Optional[bool]:
+        """
+        Blocks in IMAP IDLE until the server pushes an EXISTS notification (new mail),
+        `timeout` seconds elapse, or `interrupt_idle()` is called from another thread.
+
+        Returns:
+            True if new mail was announced, False on timeout/interrupt,
+            or None if the server does not accept IDLE (callers should fall back to polling).
+
+        Raises:
+            imaplib.IMAP4.error or OSError if the IDLE connection fails; it is reset for the next call.
+        """
+        if self._idle_conn is None:
+            self._idle_conn = self._connect_imap()
+            if self._idle_conn is None:
+                raise imaplib.IMAP4.error("Could not open IMAP connection for IDLE.")
+            if not self._server_supports_idle(self._idle_conn):
+                logger.warning("IMAP server does not advertise the IDLE capability.")
+                self._close_idle_connection()
+                return None
+        mail_server = self._idle_conn
 
         try:
-            # Search for all unseen emails.
-            # Other criteria can be used, e.g., 'NEW' (unread since last select), 'SINCE "01-Jan-2023"'
-            status, message_uids_bytes = mail_server.search(None, "UNSEEN")
-            if status != "OK":
-                logger.error(f"IMAP search for UNSEEN emails failed with status: {status}")
-                return new_incidents
-
-            email_imap_uids = message_uids_bytes[0].split() # These are UIDs or sequence numbers as bytes
-            if not email_imap_uids:
-                logger.info("No new unread emails found in this cycle (based on UNSEEN).")
-                return new_incidents
-            
-            logger.info(f"Found {len(email_imap_uids)} new unread email(s) by IMAP UID based on UNSEEN search.")
-
-            for imap_msg_uid_bytes in email_imap_uids:
-                imap_msg_uid_str = imap_msg_uid_bytes.decode() # For logging and internal use
-                
-                # Fetch the full email (RFC822)
-                # Using UID FETCH is generally more reliable with UIDs if the server supports it well.
-                # If search returns sequence numbers, use those directly.
-                # For simplicity, we assume search returns identifiers usable with FETCH.
-                status, msg_data = mail_server.fetch(imap_msg_uid_bytes, "(RFC822)")
-                
-                if status == "OK":
-                    raw_email_bytes = None
-                    # msg_data is a list, typically with one item for the fetched email
-                    for response_part in msg_data:
-                        if isinstance(response_part, tuple) and response_part[0].endswith(b'(RFC822)'):
-                            raw_email_bytes = response_part[1]
-                            break 
-
-                    if raw_email_bytes:
-                        # Attempt to parse the email into an Incident object
-                        incident = self.parser.parse_email_to_incident(
-                            imap_msg_uid=imap_msg_uid_str,
-                            raw_email_bytes=raw_email_bytes,
-                            agent_sender_email=self.config.sender_email # To avoid self-loops
-                        )
-                        
-                        if incident: # Successfully parsed into a potential incident
-                            if incident.id in self.processed_incident_ids:
-                                logger.info(f"Skipping already processed incident (ID: {incident.id}, IMAP UID: {imap_msg_uid_str}). Marking as seen.")
-                            else:
-                                new_incidents.append(incident)
-                                self.processed_incident_ids.add(incident.id) # Add unique Incident ID
-                                logger.info(f"Successfully parsed new incident (ID: {incident.id}) from IMAP UID {imap_msg_uid_str}.")
-                        else: # Parser returned None (e.g., auto-reply, parsing error, or self-sent)
-                            # The parser logs why it skipped. We just note it was handled.
-                            logger.info(f"Parser determined email IMAP UID {imap_msg_uid_str} is not a processable incident or failed parsing.")
-                            # Add a placeholder to processed_ids if Message-ID could be extracted even for non-incidents
-                            # to prevent re-parsing errors. For now, we rely on parser to return Incident object.
-
-                        # Mark email as seen on the server regardless of whether it's a valid incident or not,
-                        # to prevent it from being fetched again by "UNSEEN" search.
-                        # For production, consider moving processed/irrelevant emails to a specific folder.
-                        mail_server.store(imap_msg_uid_bytes, '+FLAGS', '\\Seen')
-                        logger.debug(f"Marked IMAP UID {imap_msg_uid_str} as \\Seen.")
-                    else:
-                        logger.warning(f"Could not retrieve RFC822 content for IMAP UID {imap_msg_uid_str}, though fetch status was OK.")
-                else:
-                    logger.error(f"Failed to fetch email content for IMAP UID {imap_msg_uid_str}. Status: {status}")
-            
-            # If using move+delete for processed emails:
-            # if mail_server.select('inbox')[0] == 'OK': # ensure inbox is still selected
-            #    mail_server.expunge()
-            #    logger.info("Expunged emails marked for deletion from inbox.")
+            tag = b'IDLE%d' % next(self._idle_tags)
+            sock = mail_server.socket()
+            mail_server.send(tag + b' IDLE\r\n')
+            new_mail = False
+            while True: # Untagged responses may precede the continuation
+                response = self._read_idle_line(sock, time.monotonic() + IDLE_RESPONSE_TIMEOUT_SECONDS, interruptible=False)
+                if response is None:
+                    raise imaplib.IMAP4.abort("IMAP server did not answer IDLE.")
+                if response.startswith(b'+'):
+                    break
+                if response.startswith(tag):
+                    logger.warning(f"IMAP server rejected IDLE: {response.strip()!r}")
+                    self._close_idle_connection()
+                    return None
+                if response.rstrip().endswith(b'EXISTS'):
+                    new_mail = True
+            logger.debug(f"Entered IMAP IDLE (refresh in {timeout:.0f}s).")
+
+            deadline = time.monotonic() + timeout
+            while not new_mail:
+                line = self._read_idle_line(sock, deadline, interruptible=True)
+                if line is None:
+                    break # Timed out (re-issue IDLE to stay within server limits) or interrupted
+                if line.rstrip().endswith(b'EXISTS'):
+                    new_mail = True
+
+            # Terminate IDLE and consume untagged lines up to the tagged completion.
+            mail_server.send(b'DONE\r\n')
+            done_deadline = time.monotonic() + IDLE_RESPONSE_TIMEOUT_SECONDS
+            while True:
+                line = self._read_idle_line(sock, done_deadline, interruptible=False)
+                if line is None:
+                    raise imaplib.IMAP4.abort("IMAP server did not complete IDLE after DONE.")
+                if line.startswith(tag):
+                    break
+                if line.rstrip().endswith(b'EXISTS'):
+                    new_mail = True
+            if new_mail:
+                logger.info("IMAP IDLE: server reported new mail.")
+            return new_mail
+        except (imaplib.IMAP4.error, OSError):
+            self._close_idle_connection()
+            raise
+
+    def _read_idle_line(self, sock: socket.socket, deadline: float, interruptible: bool) -> Optional[bytes]:
+        """
+        Returns the next line received on the IDLE connection, buffering any bytes that follow it.
+        Returns None if `deadline` passes first or, if `interruptible`, `interrupt_idle()` is called.
+
+        Raises:
+            imaplib.IMAP4.abort if the server closes the connection.
+        """
+        while True:
+            end = self._idle_buffer.find(b'\n')
+            if end >= 0:
+                line = bytes(self._idle_buffer[:end + 1])
+                del self._idle_buffer[:end + 1]
+                return line
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            # The TLS layer may already hold decrypted data, which select() on the socket would not see.
+            if not getattr(sock, 'pending', lambda: 0)():
+                watched = [sock, self._idle_wakeup_r] if interruptible else [sock]
+                readable, _, _ = select.select(watched, [], [], remaining)
+                if self._idle_wakeup_r in readable:
+                    self._idle_wakeup_r.recv(1024) # Drain wake-up bytes
+                    logger.debug("IMAP IDLE interrupted.")
+                    return None
+                if not readable:
+                    return None
+            data = sock.recv(65536)
+            if not data:
+                raise imaplib.IMAP4.abort("IMAP connection closed by server during IDLE.")
+            self._idle_buffer += data
 
+    @staticmethod
+    def _server_supports_idle(mail_server: imaplib.IMAP4_SSL) -> bool:
+        """
+        Checks the post-login CAPABILITY list for IDLE (servers may advertise more after LOGIN
+        than in their greeting). Errs towards trying IDLE if CAPABILITY itself fails.
+        """
+        try:
+            status, data = mail_server.capability()
         except imaplib.IMAP4.error as e:
-            logger.error(f"IMAP operation error during email fetching: {e}", exc_info=True)
+            logger.debug(f"IMAP CAPABILITY failed ({e}); trying IDLE anyway.")
+            return True
+        if status != 'OK' or not data or not data[0]:
+            return True
+        return b'IDLE' in data[0].upper().split()
+
+    def interrupt_idle(self):
+        """Wakes a thread blocked in `wait_for_new_mail` so it returns promptly."""
+        try:
+            self._idle_wakeup_w.send(b'x')
+        except OSError as e:
+            logger.debug(f"Could not signal IMAP IDLE wake-up: {e}")
+
+    def _close_idle_connection(self):
+        """Logs out and forgets the IDLE connection, ignoring errors on an already broken socket."""
+        if self._idle_conn is None:
+            return
+        try:
+            self._idle_conn.logout()
         except Exception as e:
-            logger.error(f"Unexpected error fetching or processing emails: {e}", exc_info=True)
-        finally:
-            if mail_server:
-                try:
-                    mail_server.close()
-                    mail_server.logout()
-                    logger.debug("IMAP connection closed and logged out.")
-                except Exception as e_close:
-                    logger.error(f"Error closing/logging out IMAP connection: {e_close}")
-        
-        return new_incidents
+            logger.debug(f"Error logging out IMAP IDLE connection: {e}")
+        self._idle_conn = None
+        self._idle_buffer.clear() # Unread bytes belonged to the closed connection
 
     def send_acknowledgement_email(self, incident: Incident, recipient_email: Optional[str] = None):
         """Sends an acknowledgement email for a processed incident via SMTP."""
@@ -184,29 +746,16 @@ class EmailHandler:
         msg['From'] = self.config.sender_email
         msg['To'] = actual_recipient
         
-        # Add In-Reply-To and References headers to thread the email correctly if it's a reply to original
-        if incident.source == "email" and incident.id.startswith("<") and incident.id.endswith(">"): # Check if ID is a Message-ID
-            msg['In-Reply-To'] = incident.id
-            msg['References'] = incident.id
-        elif incident.source == "email" and incident.raw_content: # Try to get Message-ID from raw_content
-             try:
-                original_email_msg = email.message_from_string(incident.raw_content)
-                original_message_id = original_email_msg.get('Message-ID')
-                if original_message_id:
-                    msg['In-Reply-To'] = original_message_id
-                    msg['References'] = original_message_id
-             except Exception as e:
-                logger.debug(f"Could not parse Message-ID from raw_content for incident {incident.id} for threading: {e}")
+        # Add In-Reply-To and References headers to thread the email correctly if it's a reply to original.
+        # (incident.id has its angle brackets stripped, so the Message-ID header captured at parse time is used.)
+        if incident.source == "email" and incident.message_id:
+            msg['In-Reply-To'] = incident.message_id
+            msg['References'] = incident.message_id
 
 
         try:
             logger.info(f"Attempting to send acknowledgement for incident {incident.id} to {actual_recipient} via {self.config.smtp_server}:{self.config.smtp_port}")
-            with smtplib.SMTP(self.config.smtp_server, self.config.smtp_port) as server:
-                server.ehlo() # Extended Hello
-                server.starttls() # Enable TLS encryption
-                server.ehlo() # Re-send EHLO after STARTTLS
-                server.login(self.config.smtp_username, self.config.smtp_password)
-                server.sendmail(self.config.sender_email, [actual_recipient], msg.as_string())
+            self._send_via_smtp(actual_recipient, msg)
             logger.info(f"Acknowledgement email sent for incident {incident.id} to {actual_recipient}.")
             incident.is_acknowledged = True
             incident.add_note(f"Acknowledgement email sent to {actual_recipient}.")
@@ -215,4 +764,12 @@ class EmailHandler:
             incident.add_note(f"Failed to send acknowledgement email (SMTP Error): {e}")
         except Exception as e:
             logger.error(f"Unexpected error sending acknowledgement email for incident {incident.id}: {e}", exc_info=True)
-            incident.add_note(f"Failed to send acknowledgement email (Unexpected Error): {e}")
\ No newline at end of file
+            incident.add_note(f"Failed to send acknowledgement email (Unexpected Error): {e}")
+
+    def send_acknowledgement_emails(self, incidents: List[Incident]):
+        """
+        Sends acknowledgements for a batch of incidents to their assigned team emails, reusing a
+        single SMTP session for all of them. Each incident's outcome is recorded on the incident.
+        """
+        for incident in incidents:
+            self.send_acknowledgement_email(incident, recipient_email=incident.assigned_team_email)
\ No newline at end of file
@@ -1,13 +1,141 @@
 # incident_classifier.py
 
-from typing import Tuple, Optional
+from typing import Dict, FrozenSet, Iterable, List, Tuple, Optional
 import logging
 
+try:
+    # Optional: Hyperscan compiles all keywords into one SIMD-accelerated matcher (x86-64 only).
+    import hyperscan
+except ImportError:
+    hyperscan = None # Fall back to pyahocorasick if available
+
+try:
+    # Optional: pyahocorasick matches all keywords of all categories in one C-level pass.
+    import ahocorasick
+except ImportError:
+    ahocorasick = None # Fall back to the per-category precompiled regexes from ConfigManager
+
 from models import Incident # Assuming Incident model is in models.py
 from config_manager import ConfigManager # Assuming ConfigManager is in config_manager.py
 
 logger = logging.getLogger(__name__)
 
+PRIORITY_LEVELS = ["P1", "P2", "P3", "P4"] # Most critical first
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _has_word_boundaries(text: str, start: int, end: int) -> bool:
+    """
+    True if text[start:end] is a whole-word occurrence, by the rule of the regex `\\b...\\b`: at each edge,
+    one side is a word character and the other is not (the ends of the text count as non-word). So a keyword
+    with a non-word edge, such as "c++", only matches where a word character follows it.
+    """
+    before = start > 0 and _is_word_char(text[start - 1])
+    after = end < len(text) and _is_word_char(text[end])
+    return _is_word_char(text[start]) != before and _is_word_char(text[end - 1]) != after
+
+
+def _has_word_boundaries_utf8(data: bytes, start: int, end: int, keyword: str) -> bool:
+    """`_has_word_boundaries` for a match of `keyword` at byte offsets [start, end) of UTF-8 encoded text."""
+    before = False
+    if start > 0:
+        lead = start - 1
+        while lead > 0 and 0x80 <= data[lead] < 0xC0: # Step back over UTF-8 continuation bytes
+            lead -= 1
+        before = _is_word_char(data[lead:start].decode("utf-8", errors="replace"))
+    after = False
+    if end < len(data):
+        tail = end + 1
+        while tail < len(data) and 0x80 <= data[tail] < 0xC0:
+            tail += 1
+        after = _is_word_char(data[end:tail].decode("utf-8", errors="replace"))
+    return _is_word_char(keyword[0]) != before and _is_word_char(keyword[-1]) != after
+
+
+def _contains_whole_word(text: str, keyword: str) -> bool:
+    """Plain `str.find` check for a whole-word occurrence of a single keyword."""
+    start = text.find(keyword)
+    while start != -1:
+        if _has_word_boundaries(text, start, start + len(keyword)):
+            return True
+        start = text.find(keyword, start + 1)
+    return False
+
+
+class _HyperscanMatcher:
+    """
+    Hyperscan database over all categories' keywords. Keywords are compiled as literals: Hyperscan's
+    `\\b` is ASCII-only (and unsupported in Unicode mode), so whole-word matches are verified on the
+    match offsets instead, with the same rule as `_has_word_boundaries`.
+    Scans share one scratch space, so a matcher must not be used from several threads at once.
+    """
+    def __init__(self, ranks_by_keyword: Dict[str, Tuple[int, ...]]):
+        self._entries = [(keyword, keyword.encode("utf-8"), ranks) for keyword, ranks in ranks_by_keyword.items()]
+        self._db = hyperscan.Database()
+        self._db.compile(
+            expressions=[encoded for _, encoded, _ in self._entries],
+            ids=list(range(len(self._entries))),
+            elements=len(self._entries),
+            flags=0, # Keywords and text are both casefolded already
+            literal=True # Pure literal compiler (Hyperscan 5.2+); no regex escaping needed
+        )
+
+    def scan(self, text: str, stop_rank: Optional[int] = None) -> List[Tuple[str, Tuple[int, ...]]]:
+        """
+        Returns the whole-word hits in `text` as (keyword, ranks), in text order.
+        Scanning stops early at the first hit whose most significant rank is `stop_rank`.
+        """
+        data = text.encode("utf-8")
+        hits: List[Tuple[str, Tuple[int, ...]]] = []
+
+        def on_match(entry_id, _start, end, _flags, _context):
+            keyword, encoded, ranks = self._entries[entry_id]
+            if not _has_word_boundaries_utf8(data, end - len(encoded), end, keyword):
+                return False
+            hits.append((keyword, ranks))
+            return ranks[0] == stop_rank # True terminates the scan
+
+        try:
+            self._db.scan(data, match_event_handler=on_match)
+        except hyperscan.ScanTerminated:
+            pass # Stopped early by on_match
+        return hits
+
+
+def _build_matcher(keyword_sets: Dict[str, FrozenSet[str]]):
+    """
+    Builds one matcher over all categories' keywords: a `_HyperscanMatcher` if Hyperscan is installed,
+    otherwise an Aho-Corasick automaton. Each keyword maps to (keyword, ranks) where ranks are the
+    positions (in `keyword_sets` order) of the categories using it. Returns None if there are no keywords.
+    """
+    ranks_by_keyword: Dict[str, List[int]] = {}
+    for rank, keywords in enumerate(keyword_sets.values()):
+        for keyword in keywords:
+            ranks_by_keyword.setdefault(keyword, []).append(rank)
+    if not ranks_by_keyword:
+        return None
+    if hyperscan is not None:
+        return _HyperscanMatcher({keyword: tuple(ranks) for keyword, ranks in ranks_by_keyword.items()})
+    automaton = ahocorasick.Automaton()
+    for keyword, ranks in ranks_by_keyword.items():
+        automaton.add_word(keyword, (keyword, tuple(ranks)))
+    automaton.make_automaton()
+    return automaton
+
+
+def _keyword_hits(matcher, text: str, stop_rank: Optional[int] = None) -> Iterable[Tuple[str, Tuple[int, ...]]]:
+    """Whole-word hits (keyword, ranks) of a `_build_matcher` matcher in `text`, in text order."""
+    if isinstance(matcher, _HyperscanMatcher):
+        return matcher.scan(text, stop_rank)
+    return (
+        (keyword, ranks) for end_index, (keyword, ranks) in matcher.iter(text)
+        if _has_word_boundaries(text, end_index - len(keyword) + 1, end_index + 1)
+    )
+
+
 class IncidentClassifier:
     """
     Classifies incidents based on priority and assigns them to the appropriate team
@@ -21,6 +149,71 @@ class IncidentClassifier:
         logger.debug(f"Team emails loaded: {list(self.config.team_emails.keys())}")
         logger.debug(f"Default team configured: Name='{self.config.default_team_name}', Email='{self.config.default_team_email}'")
 
+        # Only teams with an email can be assigned (see ConfigManager.assignable_teams); others are not matched at all.
+        self._team_names: List[str] = list(self.config.assignable_teams)
+        self._use_automata = hyperscan is not None or ahocorasick is not None
+        self._priority_automaton = None # Stays None (no matches) if the category has no keywords
+        self._team_automaton = None
+        if self._use_automata:
+            self._priority_automaton = _build_matcher(
+                {p_level: self.config.priority_keywords.get(p_level, frozenset()) for p_level in PRIORITY_LEVELS}
+            )
+            self._team_automaton = _build_matcher(
+                {team_name: self.config.team_keywords[team_name] for team_name in self._team_names}
+            )
+            logger.debug(f"Keyword matching uses {'Hyperscan' if hyperscan is not None else 'Aho-Corasick automata'}.")
+        # Last keyword that classified an incident as P1. Monitoring systems tend to send bursts of
+        # identical alerts, so checking it first often avoids a full scan.
+        self._last_p1_keyword: Optional[str] = None
+
+    def _match_priority(self, text_to_scan: str) -> Optional[Tuple[str, str]]:
+        """Returns (priority level, matched keyword) of the most critical level matching the text, or None."""
+        if self._last_p1_keyword and _contains_whole_word(text_to_scan, self._last_p1_keyword):
+            return PRIORITY_LEVELS[0], self._last_p1_keyword
+
+        best: Optional[Tuple[int, str]] = None
+        if self._priority_automaton is not None:
+            # Single pass over the text; keep the most critical whole-word match.
+            for keyword, ranks in _keyword_hits(self._priority_automaton, text_to_scan, stop_rank=0):
+                if best is None or ranks[0] < best[0]:
+                    best = (ranks[0], keyword)
+                    if best[0] == 0:
+                        break # Nothing outranks P1
+        elif not self._use_automata:
+            # Iterate through priorities in a specific order (P1 is most critical)
+            for rank, p_level in enumerate(PRIORITY_LEVELS):
+                # One precompiled alternation of this level's (already casefolded) keywords
+                keyword_pattern = self.config.priority_keywords_re.get(p_level)
+                match = keyword_pattern.search(text_to_scan) if keyword_pattern is not None else None
+                if match:
+                    best = (rank, match.group(1))
+                    break
+
+        if best is None:
+            return None
+        if best[0] == 0:
+            self._last_p1_keyword = best[1]
+        return PRIORITY_LEVELS[best[0]], best[1]
+
+    def _match_team(self, text_to_scan: str) -> Optional[Tuple[str, str]]:
+        """Returns (team name, matched keyword) of the first assignable team in [Teams] order whose keywords match, or None."""
+        if self._team_automaton is not None:
+            best: Optional[Tuple[int, str]] = None
+            for keyword, ranks in _keyword_hits(self._team_automaton, text_to_scan, stop_rank=0):
+                if best is None or ranks[0] < best[0]:
+                    best = (ranks[0], keyword)
+                    if best[0] == 0:
+                        break # Nothing outranks the first team
+            return (self._team_names[best[0]], best[1]) if best is not None else None
+        if not self._use_automata:
+            # self.config.team_keywords_re is like: {'networkteam': re.compile(r'\b(network|...)\b'), ...}
+            for team_name_key in self._team_names:
+                keyword_pattern = self.config.team_keywords_re.get(team_name_key)
+                match = keyword_pattern.search(text_to_scan) if keyword_pattern is not None else None
+                if match:
+                    return team_name_key, match.group(1)
+        return None
+
     def classify_incident_priority(self, incident: Incident) -> str:
         """
         Determines the priority of an incident based on keywords found in its subject or body.
@@ -34,18 +227,16 @@ class IncidentClassifier:
         Returns:
             A string representing the classified priority (e.g., "P1", "P2", "P3", "P4").
         """
-        # Concatenate subject and body for a comprehensive text scan, convert to lowercase once.
-        text_to_scan = (incident.subject + " " + incident.body).lower()
+        # Subject and body concatenated and casefolded once per incident (shared with team assignment).
+        text_to_scan = incident.search_text
         
-        # Iterate through priorities in a specific order (P1 is most critical)
-        for p_level in ["P1", "P2", "P3", "P4"]:
-            keywords_for_level = self.config.priority_keywords.get(p_level, [])
-            for keyword in keywords_for_level: # These keywords are already lowercased by ConfigManager
-                if keyword in text_to_scan:
-                    note = f"Priority classified as {p_level} due to keyword: '{keyword}'."
-                    incident.add_note(note)
-                    logger.info(f"Incident {incident.id}: {note}")
-                    return p_level
+        priority_match = self._match_priority(text_to_scan)
+        if priority_match:
+            p_level, keyword = priority_match
+            note = f"Priority classified as {p_level} due to keyword: '{keyword}'."
+            incident.add_note(note)
+            logger.info(f"Incident {incident.id}: {note}")
+            return p_level
         
         # If no keywords matched, assign a default priority
         default_priority = "P3" # Hardcoded default, could be made configurable
@@ -68,38 +259,21 @@ class IncidentClassifier:
                 - team_name_display (str): The display name of the assigned team (e.g., "NetworkTeam").
                 - team_email (str): The email address of the assigned team.
         """
-        text_to_scan = (incident.subject + " " + incident.body).lower()
+        text_to_scan = incident.search_text # Cached on the incident by classify_incident_priority
         
-        # Iterate through configured teams and their keywords from [Teams] section.
-        # self.config.team_keywords is like: {'NetworkTeam': ['network', ...], 'DatabaseTeam': ['db', ...]}
-        # team_name_key is the key from the [Teams] section (e.g., "NetworkTeam")
-        for team_name_key, keywords_for_team in self.config.team_keywords.items():
-            for keyword in keywords_for_team: # These keywords are already lowercased
-                if keyword in text_to_scan:
-                    # Team found. Now get its email.
-                    # Email lookup uses the lowercase version of team_name_key.
-                    team_email = self.config.team_emails.get(team_name_key.lower())
-                    
-                    if not team_email:
-                        note = (f"Keyword '{keyword}' matched team '{team_name_key}', "
-                                f"but no email found for '{team_name_key.lower()}' in [TeamEmails] section. "
-                                "Assigning to default team instead.")
-                        incident.add_note(note)
-                        logger.warning(f"Incident {incident.id}: {note}")
-                        # Break from inner loop and let it fall to default team logic
-                        break 
-                    else:
-                        note = f"Assigned to team '{team_name_key}' based on keyword: '{keyword}'. Email: {team_email}"
-                        incident.add_note(note)
-                        logger.info(f"Incident {incident.id}: {note}")
-                        return team_name_key, team_email # Return the display name and email
-            
-            if incident.assigned_team: # If assigned in the inner loop due to missing email, fall to default
-                break
-
-
-        # If no specific team keywords matched or if a matched team had no email, assign to default team.
-        note = (f"No specific team keywords matched or issue with matched team's email. "
+        # First team (in [Teams] order) whose keywords match; team_name_key is its key from the
+        # [Teams] section (e.g., "networkteam"). Teams without an email were excluded at startup.
+        team_match = self._match_team(text_to_scan)
+        if team_match:
+            team_name_key, keyword = team_match
+            team_email = self.config.assignable_teams[team_name_key]
+            note = f"Assigned to team '{team_name_key}' based on keyword: '{keyword}'. Email: {team_email}"
+            incident.add_note(note)
+            logger.info(f"Incident {incident.id}: {note}")
+            return team_name_key, team_email # Return the display name and email
+
+        # If no specific team keywords matched, assign to default team.
+        note = (f"No specific team keywords matched. "
                 f"Assigning to default team: Name='{self.config.default_team_name}', Email='{self.config.default_team_email}'.")
         incident.add_note(note)
         logger.info(f"Incident {incident.id}: {note}")
@@ -1,16 +1,58 @@
 # incident_parser.py
 
 import email
+import email.message # Not loaded by the submodules below; used in annotations evaluated at import time
 from email.header import decode_header
+from email.parser import BytesHeaderParser
 from email.utils import parseaddr
 import re
 from typing import Optional
 import logging
 
-from models import Incident # Assuming models.py defines the Incident Pydantic model
+from models import Incident # Assuming models.py defines the Incident model
+
+try:
+    # Optional: C-implemented HTML parser for converting HTML bodies to text in a single pass.
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None # Fall back to regex-based tag stripping
+
+try:
+    # Optional: SIMD-accelerated base64 decoding of MIME parts.
+    import pybase64
+except ImportError:
+    pybase64 = None # Fall back to the email package's (binascii) decoder
 
 logger = logging.getLogger(__name__)
 
+# Regex fallback for HTML-to-text conversion (see IncidentParser._html_to_text)
+_RE_STYLE = re.compile(r'<style[^>]*>.*?</style>', re.DOTALL | re.IGNORECASE)
+_RE_SCRIPT = re.compile(r'<script[^>]*>.*?</script>', re.DOTALL | re.IGNORECASE)
+_RE_TAG = re.compile(r'<[^>]+>')
+_RE_WS = re.compile(r'\s+')
+
+# Parses only the header block (the body is kept as an unparsed string payload).
+_HEADER_PARSER = BytesHeaderParser()
+
+# Subjects of auto-replies, out-of-office notices and delivery status notifications, in one alternation.
+_RE_AUTO_REPLY_SUBJECT = re.compile(
+    r'auto[- ]?reply|out of office|automatic reply|undeliverable|delivery status notification|non-remise',
+    re.IGNORECASE
+)
+
+def _decoded_payload(part: email.message.Message) -> Optional[bytes]:
+    """
+    Equivalent of `part.get_payload(decode=True)` for a non-multipart part, decoding base64
+    with pybase64 when installed. Payloads pybase64 rejects (e.g., padding cut off by a truncated
+    triage fetch) are left to the email package, which decodes them leniently.
+    """
+    if pybase64 is not None and str(part.get("Content-Transfer-Encoding", "")).strip().lower() == "base64":
+        try:
+            return pybase64.b64decode(part.get_payload(), validate=False)
+        except (ValueError, TypeError):
+            pass
+    return part.get_payload(decode=True)
+
 class IncidentParser:
     """
     Parses incoming raw data (e.g., email content) into a structured Incident object.
@@ -33,6 +75,34 @@ class IncidentParser:
             return header_value # Return original if decoding fails badly
         return "".join(decoded_parts)
 
+    def _html_to_text(self, html: str) -> str:
+        """
+        Converts an HTML body to plain text with normalized whitespace, dropping <style> and <script> content.
+        Uses selectolax (which also decodes entities) when installed, otherwise regular expressions.
+        """
+        if LexborHTMLParser is not None:
+            try:
+                tree = LexborHTMLParser(html)
+                tree.strip_tags(['style', 'script'])
+                return _RE_WS.sub(' ', tree.text(separator=' ')).strip()
+            except Exception as e:
+                logger.debug(f"selectolax could not convert HTML body ({e}); falling back to regex stripping.")
+        # For robust HTML parsing, consider installing selectolax.
+        text = _RE_STYLE.sub('', html)
+        text = _RE_SCRIPT.sub('', text)
+        text = _RE_TAG.sub(' ', text) # Replace tags with a space
+        return _RE_WS.sub(' ', text).strip() # Normalize whitespace
+
+    def _decode_part(self, part: email.message.Message) -> Optional[str]:
+        """Decodes one MIME part's payload (base64/quoted-printable, then charset) to text; None on failure."""
+        charset = part.get_content_charset() or "utf-8" # Default to utf-8 if not specified
+        payload = _decoded_payload(part) # Decode from base64 or quoted-printable
+        try:
+            return payload.decode(charset, errors="replace") # Replace undecodable chars
+        except Exception as e:
+            logger.warning(f"Could not decode email part with charset {charset}: {e}. Content-Type: {part.get_content_type()}")
+            return None
+
     def _get_email_body(self, msg: email.message.Message) -> str:
         """
         Extracts and decodes the text body from an email.message.Message object.
@@ -41,48 +111,40 @@ class IncidentParser:
         body = ""
         if msg.is_multipart():
             plain_text_parts = []
-            html_text_parts = [] # Collect HTML parts in case plain text is not available
+            html_parts = [] # HTML parts, decoded only if plain text is not available
             for part in msg.walk():
+                # Check type and disposition first: attachments and non-text parts are skipped
+                # without base64-decoding their (potentially multi-MB) payloads.
                 content_type = part.get_content_type()
+                if content_type not in ("text/plain", "text/html"):
+                    continue
                 content_disposition = str(part.get("Content-Disposition"))
 
                 # Skip attachments
                 if "attachment" in content_disposition.lower():
                     continue
 
-                charset = part.get_content_charset() or "utf-8" # Default to utf-8 if not specified
-                payload = part.get_payload(decode=True) # Decode from base64 or quoted-printable
-
-                try:
-                    text_content = payload.decode(charset, errors="replace") # Replace undecodable chars
-                    if content_type == "text/plain":
-                        plain_text_parts.append(text_content)
-                    elif content_type == "text/html":
-                        html_text_parts.append(text_content)
-                except Exception as e:
-                    logger.warning(f"Could not decode email part with charset {charset}: {e}. Content-Type: {content_type}")
+                if content_type == "text/html":
+                    html_parts.append(part)
+                    continue
+                text_content = self._decode_part(part)
+                if text_content is not None:
+                    plain_text_parts.append(text_content)
             
             if plain_text_parts:
                 body = "\n".join(plain_text_parts)
-            elif html_text_parts: # Fallback to HTML if no plain text
+            elif html_parts: # Fallback to HTML if no plain text
                 logger.debug("No text/plain part found, using text/html part.")
-                html_body = "\n".join(html_text_parts)
-                # Basic HTML to text conversion: remove style, script, and all other tags.
-                # For robust HTML parsing, consider libraries like BeautifulSoup.
-                body = re.sub(r'<style[^>]*>.*?</style>', '', html_body, flags=re.DOTALL | re.IGNORECASE)
-                body = re.sub(r'<script[^>]*>.*?</script>', '', body, flags=re.DOTALL | re.IGNORECASE)
-                body = re.sub(r'<[^>]+>', ' ', body) # Replace tags with a space
-                body = re.sub(r'\s+', ' ', body).strip() # Normalize whitespace
+                html_body = "\n".join(text for text in map(self._decode_part, html_parts) if text is not None)
+                # HTML to text conversion: remove style, script, and all other tags.
+                body = self._html_to_text(html_body)
         else: # Not multipart (plain text or HTML email)
             charset = msg.get_content_charset() or "utf-8"
-            payload = msg.get_payload(decode=True)
+            payload = _decoded_payload(msg)
             try:
                 body = payload.decode(charset, errors="replace")
                 if msg.get_content_type() == "text/html": # If it's HTML, strip tags
-                    body = re.sub(r'<style[^>]*>.*?</style>', '', body, flags=re.DOTALL | re.IGNORECASE)
-                    body = re.sub(r'<script[^>]*>.*?</script>', '', body, flags=re.DOTALL | re.IGNORECASE)
-                    body = re.sub(r'<[^>]+>', ' ', body)
-                    body = re.sub(r'\s+', ' ', body).strip()
+                    body = self._html_to_text(body)
             except Exception as e:
                 logger.warning(f"Could not decode non-multipart email body with charset {charset}: {e}")
         
@@ -104,30 +166,26 @@ class IncidentParser:
             agent_sender_email: The email address of the agent itself, to avoid self-processing loops.
         """
         try:
-            msg = email.message_from_bytes(raw_email_bytes)
+            # Headers only for the relevance filters; the MIME body tree is built only for emails that pass them.
+            headers = _HEADER_PARSER.parsebytes(raw_email_bytes)
 
-            subject = self._decode_header_value(msg.get("Subject", "(No Subject)"))
-            from_header_decoded = self._decode_header_value(msg.get("From", ""))
+            subject = self._decode_header_value(headers.get("Subject", "(No Subject)"))
+            from_header_decoded = self._decode_header_value(headers.get("From", ""))
             # parseaddr returns (Real Name, email_address)
             sender_email_address = parseaddr(from_header_decoded)[1].lower()
 
             # --- Filter out irrelevant emails ---
-            lower_subject = subject.lower()
-            common_auto_reply_phrases = [
-                "auto-reply", "out of office", "automatic reply", 
-                "undeliverable", "delivery status notification", "non-remise"
-            ]
-            if any(phrase in lower_subject for phrase in common_auto_reply_phrases):
+            if _RE_AUTO_REPLY_SUBJECT.search(subject): # Common auto-reply phrases, case-insensitive
                 logger.info(f"Skipping email UID {imap_msg_uid} (auto-reply/OOO/DSN based on subject): '{subject}'")
                 return None
 
             # Check for X-Auto-Response-Suppress header (used by Exchange etc. to prevent auto-replies)
-            if msg.get("X-Auto-Response-Suppress") and "All" in msg.get("X-Auto-Response-Suppress", ""):
+            if headers.get("X-Auto-Response-Suppress") and "All" in headers.get("X-Auto-Response-Suppress", ""):
                 logger.info(f"Skipping email UID {imap_msg_uid} (X-Auto-Response-Suppress header found): '{subject}'")
                 return None
             
             # Check for Auto-Submitted header (RFC 3834) - common for automated messages
-            auto_submitted_header = msg.get("Auto-Submitted", "").lower()
+            auto_submitted_header = headers.get("Auto-Submitted", "").lower()
             if auto_submitted_header and auto_submitted_header != "no": # "no" means it's not auto-submitted
                 logger.info(f"Skipping email UID {imap_msg_uid} (Auto-Submitted: {auto_submitted_header}): '{subject}'")
                 return None
@@ -137,11 +195,12 @@ class IncidentParser:
                 return None
             # --- End of filters ---
 
+            msg = email.message_from_bytes(raw_email_bytes)
             body_text = self._get_email_body(msg)
             
             # Use Message-ID as the primary unique ID if available; it's generally more globally unique.
             # Fall back to IMAP UID if Message-ID is not present.
-            message_id_header = self._decode_header_value(msg.get("Message-ID"))
+            message_id_header = self._decode_header_value(headers.get("Message-ID"))
             incident_id = message_id_header.strip("<>") if message_id_header else f"imap-uid-{imap_msg_uid}"
             
             logger.debug(f"Successfully parsed email. UID: {imap_msg_uid}, Incident ID: {incident_id}, Subject: '{subject}'")
@@ -151,12 +210,31 @@ class IncidentParser:
                 source="email",
                 subject=subject.strip(),
                 body=body_text,
-                raw_content=raw_email_bytes.decode('utf-8', errors='ignore') # Store for audit/debugging
+                sender=sender_email_address,
+                message_id=message_id_header.strip() if message_id_header else None,
+                raw_content=raw_email_bytes # Kept as bytes for audit/debugging; see Incident.raw_content_text
             )
         except Exception as e:
             logger.error(f"Fatal error parsing email UID {imap_msg_uid}: {e}", exc_info=True)
             return None
 
+    def parse_parts_to_incident(
+        self,
+        imap_msg_uid: str,
+        headers_bytes: bytes,
+        text_bytes: bytes,
+        agent_sender_email: Optional[str] = None
+    ) -> Optional[Incident]:
+        """
+        Parses an email fetched as separate header and body sections (IMAP BODY[HEADER] / BODY[TEXT],
+        possibly truncated) into an Incident. The sections are rejoined so the same header decoding
+        and body extraction as `parse_email_to_incident` apply.
+        """
+        # BODY[HEADER] normally includes the blank line that ends the header block; add it if missing.
+        if not headers_bytes.endswith(b"\r\n\r\n") and not headers_bytes.endswith(b"\n\n"):
+            headers_bytes += b"\r\n"
+        return self.parse_email_to_incident(imap_msg_uid, headers_bytes + text_bytes, agent_sender_email)
+
     # Future extensibility:
     # def parse_api_payload_to_incident(self, payload: dict) -> Optional[Incident]:
     #     """Parses a JSON payload from a monitoring API into an Incident object."""
@@ -0,0 +1,96 @@
+# incident_store.py
+
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set: `in` may return a false positive (at roughly `error_rate`)
+    but never a false negative. Uses ~10-20 bits per entry instead of a full string per entry.
+    """
+    def __init__(self, capacity: int, error_rate: float):
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing (Kirsch-Mitzenmacher): two 64-bit halves of one digest give all k positions.
+        digest = hashlib.blake2b(item.encode("utf-8", errors="replace"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class ProcessedIncidentStore:
+    """
+    Restart-safe record of incident IDs that have already been fetched and handled.
+    IDs are persisted in a SQLite table; an in-memory Bloom filter answers most (negative)
+    membership checks without touching the database. New IDs are buffered and written in
+    one batch by `flush()`.
+    """
+    def __init__(self, db_path: str, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        self.db_path = db_path
+        # Used from whichever I/O worker thread runs the fetch; access is serialized by the lock.
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS processed (id TEXT PRIMARY KEY, ts REAL)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._pending: Set[str] = set() # Added since the last flush()
+
+        count = 0
+        for (incident_id,) in self._db.execute("SELECT id FROM processed"):
+            self._bloom.add(incident_id)
+            count += 1
+        logger.info(f"Loaded {count} processed incident ID(s) from {db_path}.")
+
+    def __contains__(self, incident_id: str) -> bool:
+        with self._lock:
+            if incident_id in self._pending:
+                return True
+            if incident_id not in self._bloom:
+                return False # Definitely never recorded
+            # Possible false positive: confirm against the database.
+            return self._db.execute("SELECT 1 FROM processed WHERE id = ?", (incident_id,)).fetchone() is not None
+
+    def add(self, incident_id: str):
+        """Records an incident ID; it is persisted on the next `flush()`."""
+        with self._lock:
+            self._pending.add(incident_id)
+            self._bloom.add(incident_id)
+
+    def flush(self):
+        """Writes all buffered IDs to the database in a single transaction."""
+        with self._lock:
+            if not self._pending:
+                return
+            now = time.time()
+            rows: List[tuple] = [(incident_id, now) for incident_id in self._pending]
+            try:
+                with self._db: # Commits on success, rolls back on error
+                    self._db.executemany("INSERT OR IGNORE INTO processed (id, ts) VALUES (?, ?)", rows)
+                self._pending.clear()
+            except sqlite3.Error as e:
+                # Keep the IDs buffered (still deduplicated in memory) and retry on the next flush.
+                logger.error(f"Failed to persist {len(rows)} processed incident ID(s) to {self.db_path}: {e}", exc_info=True)
+
+    def close(self):
+        """Flushes buffered IDs and closes the database."""
+        self.flush()
+        with self._lock:
+            self._db.close()
\ No newline at end of file
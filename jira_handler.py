@@ -1,26 +1,139 @@
 # jira_handler.py
 
+import collections # Bounded, insertion-ordered cache of filed tickets
 from jira import JIRA, JIRAError # jira library for interacting with Jira
+import requests # Network-level exceptions raised by the JIRA client's session
+from requests.adapters import HTTPAdapter # Connection pool sizing for the JIRA client's session
+import urllib3 # Underlying connection errors wrapped by requests' ConnectionError
 import logging
-from typing import Optional
+import io # In-memory file for attaching long incident bodies
+import threading # Serializes the lazy connection set-up across I/O worker threads
+import time
+from typing import Dict, List, Optional, Tuple
 
 from models import Incident # Assuming Incident model is in models.py
 from config_manager import ConfigManager # Assuming ConfigManager is in config_manager.py
 
 logger = logging.getLogger(__name__)
 
+# HTTP statuses after which a ticket-creation request is retried: rate limiting and availability errors,
+# which are returned instead of processing the request. 500 is not retried, as the issue may already have been
+# created; nor is 504 (gateway timeout), where Jira may have finished the create after the gateway gave up
+# (the same as a read timeout).
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503})
+# Appended to the incident note when a create may have succeeded despite the error (read timeout, HTTP 504,
+# connection lost after the request was sent).
+_MAYBE_CREATED_HINT = " The ticket may still have been created; check Jira before creating one manually."
+
+# How long the resolved project and issue type IDs are reused before being looked up again, so that
+# changes made by a Jira admin are picked up by a long-running agent.
+ISSUE_IDS_TTL_SECONDS = 3600
+# After a failed lookup, tickets are created by name for this long before the lookup is tried again.
+ISSUE_IDS_RETRY_SECONDS = 60
+
+# Incident IDs whose ticket was created in this process are remembered (up to this many, for this long),
+# so handing the same incident to the handler again returns the existing ticket instead of filing a duplicate.
+FILED_TICKETS_CACHE_SIZE = 10_000
+FILED_TICKETS_TTL_SECONDS = 24 * 3600
+
+# Circuit breaker: after this many consecutive failed ticket requests (Jira unreachable, gateway errors, read
+# timeouts), further requests fail immediately for CIRCUIT_OPEN_SECONDS instead of each waiting on the outage.
+# After that, a single request is let through as a probe (others still fail fast while it runs); if it fails
+# too, the circuit opens again. Incidents skipped while the circuit is open get no ticket (see _circuit_open).
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_OPEN_SECONDS = 60
+
+# File name under which a truncated incident body is attached to its ticket in full.
+FULL_BODY_ATTACHMENT_NAME = "original_body.txt"
+# File name used instead when the email itself could only be fetched in part (Incident.body_truncated).
+PARTIAL_BODY_ATTACHMENT_NAME = "original_body_partial.txt"
+_PARTIAL_BODY_MARKER = "the email body was cut at the agent's fetch limit and the rest could not be fetched"
+
+
+def _truncate_body(body: str, limit: int, partial: bool = False) -> str:
+    """
+    Returns `body` cut to `limit` characters, with a marker saying how much was left out and where the
+    rest is attached. `partial` says the body is itself only a prefix of the email (see Incident.body_truncated).
+    """
+    if len(body) <= limit:
+        return f"{body}\n...[{_PARTIAL_BODY_MARKER}]" if partial else body
+    if partial:
+        return (f"{body[:limit]}\n...[truncated {len(body) - limit} characters; the {len(body)} characters received "
+                f"are attached as {PARTIAL_BODY_ATTACHMENT_NAME}, but {_PARTIAL_BODY_MARKER}]")
+    return f"{body[:limit]}\n...[truncated {len(body) - limit} characters; full text attached as {FULL_BODY_ATTACHMENT_NAME}]"
+
+
+class JiraTransientError(Exception):
+    """
+    Raised when a Jira request failed for a reason that is likely temporary (see RETRYABLE_STATUS_CODES,
+    or the connection could not be established); the caller may retry later.
+    `retry_after` holds the server's Retry-After hint in seconds, if one was sent.
+    """
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JiraRateLimitError(JiraTransientError):
+    """Raised when Jira rejects a request with HTTP 429 (Too Many Requests)."""
+
+
 class JiraHandler:
     """
     Handles interactions with a Jira instance, primarily for creating tickets.
     """
+    # Jira accepts at most this many issues in one bulk create request.
+    BULK_CREATE_MAX_ISSUES = 50
+
+    # Layout of the ticket description, filled in once per incident by _format_description.
+    _DESC_TEMPLATE = (
+        "Automated P1 Incident Report from: {agent}\n"
+        "Source System: {source}\n"
+        "Source Incident ID: {id}\n" # e.g., Email Message-ID
+        "Detected Priority: {priority}\n"
+        "Auto-Assigned Team: {team}\n"
+        "\nOriginal Subject:\n{subject}\n"
+        "\nOriginal Body/Details:\n--------------------\n{body}\n--------------------\n"
+        "\nAgent Processing Notes:{notes}"
+    )
+
     def __init__(self, config: ConfigManager):
         self.config = config
+        # Created on first use (see ensure_connected): most cycles have no P1 incidents, so no
+        # connection is made at startup.
         self.jira_client: Optional[JIRA] = None
-        self._connect_to_jira()
+        self._connect_lock = threading.Lock()
+        # (project ID, issue type ID) for the configured project key and P1 issue type, and when they were resolved.
+        self._issue_ids: Optional[Tuple[str, str]] = None
+        self._issue_ids_resolved_at = 0.0
+        self._issue_ids_failed_at: Optional[float] = None # When the last lookup failed (None if it did not)
+        self._issue_ids_lookup_in_flight = False # Another thread is looking the IDs up; use names meanwhile
+        self._issue_ids_lock = threading.Lock()
+        # Incident ID -> (ticket key, time filed), oldest first; see FILED_TICKETS_TTL_SECONDS.
+        self._filed_tickets: "collections.OrderedDict[str, Tuple[str, float]]" = collections.OrderedDict()
+        self._filed_tickets_lock = threading.Lock()
+        # Circuit breaker state (see CIRCUIT_FAILURE_THRESHOLD), shared by the I/O worker threads.
+        self._consecutive_failures = 0
+        self._circuit_opened_at = 0.0
+        self._probe_in_flight = False # A request is testing whether Jira has recovered (half-open circuit)
+        self._circuit_lock = threading.Lock()
+
+    def ensure_connected(self) -> bool:
+        """
+        Returns True if a Jira client is available, creating it on first use. A failed attempt is
+        retried on the next call. Safe to call from several worker threads at once.
+        """
+        if self.jira_client is not None:
+            return True
+        with self._connect_lock:
+            if self.jira_client is None: # Another thread may have connected while we waited
+                self._connect_to_jira()
+            return self.jira_client is not None
 
     def _connect_to_jira(self):
         """
-        Establishes a connection to the Jira server using credentials from config.
+        Creates the Jira client using credentials from config. No request is sent: the connection and
+        credentials are exercised by the first ticket creation itself.
         Sets `self.jira_client` to the JIRA object if successful, or None otherwise.
         """
         if not all([self.config.jira_url, self.config.jira_username, self.config.jira_api_token]):
@@ -29,26 +142,100 @@ class JiraHandler:
             return
 
         try:
-            logger.info(f"Attempting to connect to Jira server: {self.config.jira_url}")
+            logger.info(f"Setting up Jira client for server: {self.config.jira_url}")
             # Options for Jira connection, server URL is primary
             jira_options = {'server': self.config.jira_url.rstrip('/')} # Ensure no trailing slash
 
             self.jira_client = JIRA(
                 options=jira_options,
-                basic_auth=(self.config.jira_username, self.config.jira_api_token)
+                basic_auth=(self.config.jira_username, self.config.jira_api_token),
+                max_retries=0, # Rate-limit retries are done by the agent, without holding a worker thread while backing off
+                get_server_info=False, # Skip the serverInfo round trip; ticket creation does not need it
+                timeout=(self.config.jira_connect_timeout, self.config.jira_read_timeout) # Applied to every request of the session
             )
-            # Test connection by trying to fetch projects (a lightweight call)
-            self.jira_client.projects() 
-            logger.info(f"Successfully connected to Jira server: {self.config.jira_url}")
+            # The client's requests session is kept for the handler's lifetime, so every ticket reuses
+            # pooled keep-alive connections. Only the Jira host is contacted, so one host pool is needed,
+            # holding a connection per concurrent worker. Retries stay with the agent (max_retries=0).
+            pool_size = max(10, self.config.async_workers)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            self.jira_client._session.mount('https://', adapter)
+            self.jira_client._session.mount('http://', adapter)
+            logger.info(f"Jira client ready for server: {self.config.jira_url}")
         except JIRAError as e:
             # JIRAError often contains useful status_code and text from Jira API
-            logger.error(f"Jira API Error during connection: Status {e.status_code} - {e.text}", exc_info=True)
+            logger.error(f"Jira API Error during connection: Status {e.status_code} - {e.text}")
             self.jira_client = None
         except Exception as e: 
             # Catch other potential errors (e.g., network issues, invalid URL format)
             logger.error(f"An unexpected error occurred during Jira connection attempt: {e}", exc_info=True)
             self.jira_client = None
 
+    def close(self):
+        """Closes the Jira client's HTTP session. Called on agent shutdown."""
+        if self.jira_client:
+            try:
+                self.jira_client.close()
+            except Exception as e:
+                logger.debug(f"Error closing Jira client session: {e}")
+            self.jira_client = None
+
+    def _resolve_issue_ids(self) -> Optional[Tuple[str, str]]:
+        """
+        Returns the IDs of the configured Jira project and P1 issue type, looked up with one request and
+        reused for ISSUE_IDS_TTL_SECONDS. Submitting IDs spares Jira resolving the names for every ticket.
+        Returns None if the IDs are not known; the caller then submits the names instead. That is the case
+        for ISSUE_IDS_RETRY_SECONDS after a failed lookup, and while another thread is doing the lookup
+        (which runs outside the lock, so concurrent batches do not wait on it).
+
+        Raises:
+            JiraTransientError: If Jira could not be reached or was unavailable (counted by the circuit
+                breaker); the ticket request would fail the same way, so it is not attempted.
+        """
+        with self._issue_ids_lock:
+            now = time.monotonic()
+            if self._issue_ids is not None and now - self._issue_ids_resolved_at < ISSUE_IDS_TTL_SECONDS:
+                return self._issue_ids
+            if self._issue_ids_failed_at is not None and now - self._issue_ids_failed_at < ISSUE_IDS_RETRY_SECONDS:
+                return None
+            if self._issue_ids_lookup_in_flight:
+                return None
+            self._issue_ids_lookup_in_flight = True
+
+        issue_ids = None
+        try:
+            project = self.jira_client.project(self.config.jira_project_key)
+            # The project resource lists the issue types available in that project.
+            issue_type_id = next((issue_type['id'] for issue_type in project.raw.get('issueTypes', [])
+                                  if issue_type.get('name') == self.config.jira_p1_issue_type), None)
+            if issue_type_id is None:
+                logger.warning(f"Issue type '{self.config.jira_p1_issue_type}' not found in Jira project '{self.config.jira_project_key}'; creating tickets by name.")
+            else:
+                issue_ids = (project.id, issue_type_id)
+                logger.info(f"Resolved Jira project '{self.config.jira_project_key}' to ID {project.id} and issue type '{self.config.jira_p1_issue_type}' to ID {issue_type_id}.")
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # A lookup is a plain read, so unlike a create it is safe to retry after a read timeout too.
+            self._record_jira_outcome(success=False)
+            logger.warning(f"Could not reach Jira to look up project '{self.config.jira_project_key}': {e}")
+            raise JiraTransientError(f"Could not reach Jira: {e}") from e
+        except JIRAError as e:
+            if e.status_code == 504 or (e.status_code in RETRYABLE_STATUS_CODES and e.status_code != 429):
+                self._record_jira_outcome(success=False)
+                logger.warning(f"Jira temporarily unavailable (HTTP {e.status_code}) while looking up project '{self.config.jira_project_key}'.")
+                raise JiraTransientError(f"Jira returned HTTP {e.status_code}: {e.text}") from e
+            logger.warning(f"Could not look up Jira project '{self.config.jira_project_key}'; creating tickets by name: Status {e.status_code} - {e.text}")
+        except Exception as e:
+            logger.warning(f"Could not look up Jira project '{self.config.jira_project_key}'; creating tickets by name: {e}")
+        finally:
+            with self._issue_ids_lock:
+                self._issue_ids_lookup_in_flight = False
+                if issue_ids is None:
+                    self._issue_ids_failed_at = time.monotonic()
+                else:
+                    self._issue_ids = issue_ids
+                    self._issue_ids_resolved_at = time.monotonic()
+                    self._issue_ids_failed_at = None
+        return issue_ids
+
     def create_jira_ticket_for_incident(self, incident: Incident) -> Optional[str]:
         """
         Creates a Jira ticket for a given incident.
@@ -59,20 +246,340 @@ class JiraHandler:
 
         Returns:
             The Jira ticket key (e.g., "PROJECT-123") if successful, otherwise None.
+
+        Raises:
+            JiraTransientError: If the request failed transiently (e.g., JiraRateLimitError for HTTP 429);
+                no ticket was created and the caller may retry later.
         """
-        if not self.jira_client:
+        # The agent only passes P1s; for direct use, rule out other priorities before touching the Jira client.
+        if not self._is_ticket_eligible(incident):
+            return None
+        if not self.ensure_connected():
             message = "Jira client is not initialized or connection failed. Cannot create ticket."
             incident.add_note(message)
             logger.error(f"Incident {incident.id}: {message}")
             return None
+        existing_key = self._existing_ticket(incident)
+        if existing_key:
+            return existing_key
+        if self._circuit_open([incident]):
+            return None
+
+        issue_dict = self._build_issue_fields(incident, self._resolve_issue_ids())
+
+        try:
+            logger.info(f"Attempting to create Jira P1 ticket for incident {incident.id} in project '{self.config.jira_project_key}' with type '{self.config.jira_p1_issue_type}'.")
+            new_issue = self.jira_client.create_issue(fields=issue_dict)
+            self._record_jira_outcome(success=True)
+            self._record_ticket(incident, new_issue.key)
+            self._attach_full_body_if_truncated(incident, new_issue.key)
+            return new_issue.key
+        except requests.exceptions.ConnectionError as e:
+            self._raise_connection_error(e, f"incident {incident.id}")
+            error_message = f"Connection to Jira was lost while creating ticket: {e}.{_MAYBE_CREATED_HINT}"
+            incident.add_note(error_message)
+            logger.error(f"Incident {incident.id}: {error_message}")
+        except JIRAError as e:
+            self._raise_if_transient(e, f"incident {incident.id}")
+            # JIRAError can provide detailed error messages from the Jira API
+            error_message_detail = f"Jira API Error creating ticket: Status {e.status_code} - {e.text}."
+            # Extract specific errors from a JSON error body (parsed once; proxies often answer with HTML
+            # pages, whose text is already in e.text)
+            response = getattr(e, 'response', None)
+            if response is not None and response.headers.get('Content-Type', '').startswith('application/json'):
+                try:
+                    error_json = response.json()
+                except ValueError: # Declared as JSON but malformed
+                    error_json = {}
+                errors = error_json.get('errors')
+                error_messages_list = error_json.get('errorMessages')
+                if errors: error_message_detail += f" Field errors: {errors}."
+                if error_messages_list: error_message_detail += f" Server messages: {', '.join(error_messages_list)}."
+            if e.status_code == 504:
+                error_message_detail += _MAYBE_CREATED_HINT
+
+            incident.add_note(error_message_detail)
+            # No stack trace: Jira's reply above says what went wrong, and it can repeat for every incident
+            logger.error(f"Incident {incident.id}: {error_message_detail}")
+        except requests.exceptions.Timeout as e:
+            # Read timeout (connect timeouts are ConnectionErrors, handled above). Not retried, as Jira may
+            # still have created the issue; expected under a slow Jira, so logged without a stack trace.
+            self._record_jira_outcome(success=False)
+            error_message = f"Jira did not respond in time while creating ticket: {e}.{_MAYBE_CREATED_HINT}"
+            incident.add_note(error_message)
+            logger.error(f"Incident {incident.id}: {error_message}")
+        except Exception as e:
+            # Catch any other unexpected errors during Jira ticket creation
+            self._record_jira_outcome(success=None)
+            error_message = f"Unexpected error creating Jira ticket: {e}"
+            incident.add_note(error_message)
+            logger.error(f"Incident {incident.id}: {error_message}", exc_info=True)
+        
+        return None # Return None if ticket creation failed
+
+    def create_jira_tickets_bulk(self, incidents: List[Incident]) -> List[Optional[str]]:
+        """
+        Creates Jira tickets for several incidents with a single `POST /rest/api/2/issue/bulk` request.
+        Jira reports success or failure per issue, so one rejected incident does not fail the others.
+
+        Args:
+            incidents: The Incident objects (normally P1s of one check cycle), at most BULK_CREATE_MAX_ISSUES.
+
+        Returns:
+            The Jira ticket key (or None if creation failed) for each incident, in the same order.
+
+        Raises:
+            JiraTransientError: If the request failed transiently (e.g., JiraRateLimitError for HTTP 429);
+                no tickets were created and the caller may retry.
+        """
+        if len(incidents) == 1:
+            return [self.create_jira_ticket_for_incident(incidents[0])] # No benefit from the bulk endpoint
 
-        # This check might be redundant if agent.py already filters, but good for direct use
+        ticket_keys: List[Optional[str]] = [None] * len(incidents)
+        # Non-P1 incidents are ruled out before touching the Jira client (see create_jira_ticket_for_incident).
+        p1_positions = [pos for pos, incident in enumerate(incidents) if self._is_ticket_eligible(incident)]
+        if not p1_positions:
+            return ticket_keys
+        if not self.ensure_connected():
+            message = "Jira client is not initialized or connection failed. Cannot create ticket."
+            for pos in p1_positions:
+                incidents[pos].add_note(message)
+                logger.error(f"Incident {incidents[pos].id}: {message}")
+            return ticket_keys
+
+        # Positions in `incidents` of the issues included in the bulk request
+        eligible_positions: List[int] = []
+        for pos in p1_positions:
+            ticket_keys[pos] = self._existing_ticket(incidents[pos])
+            if ticket_keys[pos] is None:
+                eligible_positions.append(pos)
+        if not eligible_positions or self._circuit_open([incidents[pos] for pos in eligible_positions]):
+            return ticket_keys
+        issue_ids = self._resolve_issue_ids()
+        field_list = [self._build_issue_fields(incidents[pos], issue_ids) for pos in eligible_positions]
+
+        try:
+            logger.info(f"Attempting to create {len(field_list)} Jira P1 tickets in one bulk request in project '{self.config.jira_project_key}' with type '{self.config.jira_p1_issue_type}'.")
+            results = self.jira_client.create_issues(field_list=field_list, prefetch=False)
+            self._record_jira_outcome(success=True)
+        except requests.exceptions.ConnectionError as e:
+            self._raise_connection_error(e, f"{len(field_list)} incidents (bulk)")
+            error_message = f"Connection to Jira was lost while creating tickets in bulk: {e}.{_MAYBE_CREATED_HINT}"
+            logger.error(error_message)
+            for pos in eligible_positions:
+                incidents[pos].add_note(error_message)
+            return ticket_keys
+        except JIRAError as e:
+            self._raise_if_transient(e, f"{len(field_list)} incidents (bulk)")
+            error_message = f"Jira API Error creating tickets in bulk: Status {e.status_code} - {e.text}."
+            if e.status_code == 504:
+                error_message += _MAYBE_CREATED_HINT
+            logger.error(error_message)
+            for pos in eligible_positions:
+                incidents[pos].add_note(error_message)
+            return ticket_keys
+        except requests.exceptions.Timeout as e: # See create_jira_ticket_for_incident
+            self._record_jira_outcome(success=False)
+            error_message = f"Jira did not respond in time while creating tickets in bulk: {e}.{_MAYBE_CREATED_HINT}"
+            logger.error(error_message)
+            for pos in eligible_positions:
+                incidents[pos].add_note(error_message)
+            return ticket_keys
+        except Exception as e:
+            self._record_jira_outcome(success=None)
+            error_message = f"Unexpected error creating Jira tickets in bulk: {e}"
+            logger.error(error_message, exc_info=True)
+            for pos in eligible_positions:
+                incidents[pos].add_note(error_message)
+            return ticket_keys
+
+        for pos, result in zip(eligible_positions, results):
+            incident = incidents[pos]
+            if result.get('status') == 'Success' and result.get('issue') is not None:
+                ticket_keys[pos] = result['issue'].key
+                self._record_ticket(incident, ticket_keys[pos])
+                self._attach_full_body_if_truncated(incident, ticket_keys[pos])
+            else:
+                error_message = f"Jira API Error creating ticket (bulk): {result.get('error')}."
+                incident.add_note(error_message)
+                logger.error(f"Incident {incident.id}: {error_message}")
+        return ticket_keys
+
+    def _is_ticket_eligible(self, incident: Incident) -> bool:
+        """Returns True if the incident qualifies for a Jira ticket (P1 only); otherwise notes why not."""
         if incident.priority != "P1":
             message = f"Incident priority is {incident.priority}, not P1. Jira ticket creation skipped by rule."
             incident.add_note(message)
             logger.info(f"Incident {incident.id}: {message}")
-            return None
+            return False
+        return True
+
+    def _existing_ticket(self, incident: Incident) -> Optional[str]:
+        """
+        Returns the key of the ticket already created in this process for the incident's ID (recording it
+        on the incident), or None if there is none or it was filed more than FILED_TICKETS_TTL_SECONDS ago.
+        """
+        with self._filed_tickets_lock:
+            entry = self._filed_tickets.get(incident.id)
+            if entry is None:
+                return None
+            ticket_key, filed_at = entry
+            if time.monotonic() - filed_at >= FILED_TICKETS_TTL_SECONDS:
+                del self._filed_tickets[incident.id]
+                return None
+        incident.jira_ticket_key = ticket_key
+        message = f"Jira ticket {ticket_key} already exists for this incident. No new ticket created."
+        incident.add_note(message)
+        logger.info(f"Incident {incident.id}: {message}")
+        return ticket_key
+
+    def _record_ticket(self, incident: Incident, ticket_key: str):
+        """Stores a created ticket key on the incident (and in the filed-tickets cache) and logs it."""
+        with self._filed_tickets_lock:
+            self._filed_tickets[incident.id] = (ticket_key, time.monotonic())
+            if len(self._filed_tickets) > FILED_TICKETS_CACHE_SIZE:
+                self._filed_tickets.popitem(last=False) # Evict the oldest entry
+        incident.jira_ticket_key = ticket_key # Store the created ticket key (e.g., "ITSM-123")
+        message = f"Jira ticket {ticket_key} created successfully."
+        incident.add_note(message)
+        logger.info(f"Incident {incident.id}: {message}")
+
+    def _attach_full_body_if_truncated(self, incident: Incident, ticket_key: str):
+        """
+        Attaches the full incident body to the ticket if it was truncated in the description. If the email
+        could only be fetched in part, what was received is attached as PARTIAL_BODY_ATTACHMENT_NAME instead.
+        The ticket already exists, so a failure here is only noted.
+        """
+        if not incident.body or len(incident.body) <= self.config.jira_body_limit:
+            return
+        partial = incident.body_truncated
+        try:
+            self.jira_client.add_attachment(
+                issue=ticket_key,
+                attachment=io.BytesIO(incident.body.encode('utf-8')),
+                filename=PARTIAL_BODY_ATTACHMENT_NAME if partial else FULL_BODY_ATTACHMENT_NAME
+            )
+            if partial:
+                incident.add_note(f"Partial incident body ({len(incident.body)} characters; the email was cut at the fetch limit) attached to Jira ticket {ticket_key}.")
+            else:
+                incident.add_note(f"Full incident body ({len(incident.body)} characters) attached to Jira ticket {ticket_key}.")
+        except Exception as e:
+            message = f"Could not attach the full incident body to Jira ticket {ticket_key}: {e}"
+            incident.add_note(message)
+            logger.warning(f"Incident {incident.id}: {message}")
+
+    def _circuit_open(self, incidents: List[Incident]) -> bool:
+        """
+        Returns True if the circuit breaker is open, i.e. Jira failed CIRCUIT_FAILURE_THRESHOLD times in a row
+        less than CIRCUIT_OPEN_SECONDS ago, or another request is already probing it. The incidents are then
+        given up on: their emails are already marked as processed, so they are not fetched again, and the
+        note and error log say that the ticket has to be created manually.
+        Otherwise returns False; after the open period, the caller's request becomes the probe.
+        """
+        with self._circuit_lock:
+            if self._consecutive_failures < CIRCUIT_FAILURE_THRESHOLD:
+                return False
+            if not self._probe_in_flight and time.monotonic() - self._circuit_opened_at >= CIRCUIT_OPEN_SECONDS:
+                self._probe_in_flight = True # Ended by _record_jira_outcome
+                return False
+        message = (f"Jira appears to be unavailable ({CIRCUIT_FAILURE_THRESHOLD}+ consecutive failures); ticket creation skipped. "
+                   f"No Jira ticket will be created automatically for this incident; please create one manually.")
+        for incident in incidents:
+            incident.add_note(message)
+            logger.error(f"Incident {incident.id}: {message}")
+        return True
+
+    def _record_jira_outcome(self, success: Optional[bool]):
+        """
+        Updates the circuit breaker after a ticket request: success closes it, a failure may open it, and
+        None (inconclusive, e.g. rate limited or an unexpected error) leaves it as is. Any outcome ends a probe.
+        """
+        with self._circuit_lock:
+            self._probe_in_flight = False
+            if success is None:
+                return
+            if success:
+                if self._consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+                    logger.info("Jira request succeeded; closing the circuit breaker.")
+                self._consecutive_failures = 0
+                return
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+                self._circuit_opened_at = time.monotonic()
+                if self._consecutive_failures == CIRCUIT_FAILURE_THRESHOLD:
+                    logger.error(f"Jira failed {CIRCUIT_FAILURE_THRESHOLD} times in a row; opening the circuit breaker for {CIRCUIT_OPEN_SECONDS}s.")
+
+    def _raise_if_transient(self, e: JIRAError, context: str):
+        """
+        Converts a JIRAError with a retryable status into JiraTransientError (JiraRateLimitError for
+        HTTP 429), carrying the Retry-After hint if any. Other errors are left to the caller.
+        """
+        if e.status_code == 504:
+            # Not retried (see RETRYABLE_STATUS_CODES), but like a read timeout it counts towards the circuit breaker.
+            self._record_jira_outcome(success=False)
+            return
+        if e.status_code not in RETRYABLE_STATUS_CODES:
+            self._record_jira_outcome(success=True) # Jira answered; the request itself was at fault
+            return
+        retry_after = None
+        if e.response is not None:
+            try:
+                retry_after = float(e.response.headers.get('Retry-After'))
+            except (TypeError, ValueError): # Header missing or given as an HTTP date
+                pass
+        if e.status_code == 429:
+            # Jira is up but throttling us; the caller backs off (Retry-After), so this does not count as a failure.
+            self._record_jira_outcome(success=None)
+            logger.warning(f"Jira rate limit hit (HTTP 429) while creating ticket(s) for {context}.")
+            raise JiraRateLimitError(f"Jira rate limit hit: {e.text}", retry_after=retry_after) from e
+        self._record_jira_outcome(success=False)
+        logger.warning(f"Jira temporarily unavailable (HTTP {e.status_code}) while creating ticket(s) for {context}.")
+        raise JiraTransientError(f"Jira returned HTTP {e.status_code}: {e.text}", retry_after=retry_after) from e
+
+    @staticmethod
+    def _request_not_sent(e: requests.exceptions.ConnectionError) -> bool:
+        """
+        True if the connection failed before the request was sent (connect timeout, connection refused,
+        name resolution), so Jira cannot have processed it. Other connection errors, e.g. a pooled keep-alive
+        connection aborted mid-request ("Connection aborted"), may come after Jira received the request.
+        """
+        if isinstance(e, requests.exceptions.ConnectTimeout):
+            return True
+        reason = e.args[0] if e.args else None
+        reason = getattr(reason, 'reason', reason) # urllib3's MaxRetryError wraps the underlying error
+        # NameResolutionError is a NewConnectionError
+        return isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError))
+
+    def _raise_connection_error(self, e: requests.exceptions.ConnectionError, context: str):
+        """
+        Converts a failure to reach Jira before the request was sent into JiraTransientError. Any other
+        connection error counts as a failure but is left to the caller: like a read timeout, it is not
+        retried, as the ticket may already have been created.
+        """
+        self._record_jira_outcome(success=False)
+        if not self._request_not_sent(e):
+            return
+        logger.warning(f"Could not reach Jira while creating ticket(s) for {context}: {e}")
+        raise JiraTransientError(f"Could not reach Jira: {e}") from e
 
+    def _format_description(self, incident: Incident) -> str:
+        """Fills the description template for an incident, listing its processing notes one per line."""
+        return self._DESC_TEMPLATE.format_map({
+            'agent': self.config.agent_name,
+            'source': incident.source,
+            'id': incident.id,
+            'priority': incident.priority,
+            'team': incident.assigned_team or 'N/A',
+            'subject': incident.subject,
+            'body': _truncate_body(incident.body, self.config.jira_body_limit, incident.body_truncated) if incident.body else '(No body content provided)',
+            'notes': "".join(f"\n- {note}" for note in incident.processing_notes),
+        })
+
+    def _build_issue_fields(self, incident: Incident, issue_ids: Optional[Tuple[str, str]]) -> Dict:
+        """
+        Builds the Jira issue fields (summary, description, project, issue type) for an incident.
+        The project and issue type are given by ID if `issue_ids` (see _resolve_issue_ids) is set, else by name.
+        """
         # Prepare Jira issue fields
         summary = f"P1 Incident: {incident.subject}"
         # Jira summary fields often have a length limit (e.g., 255 chars)
@@ -82,24 +589,18 @@ class JiraHandler:
             logger.warning(f"Incident {incident.id}: Summary was truncated to {max_summary_len} characters for Jira.")
 
         # Construct a detailed description for the Jira ticket
-        description_parts = [
-            f"Automated P1 Incident Report from: {self.config.agent_name}",
-            f"Source System: {incident.source}",
-            f"Source Incident ID: {incident.id}", # e.g., Email Message-ID
-            f"Detected Priority: {incident.priority}",
-            f"Auto-Assigned Team: {incident.assigned_team or 'N/A'}",
-            f"\nOriginal Subject:\n{incident.subject}",
-            f"\nOriginal Body/Details:\n{'-'*20}\n{incident.body if incident.body else '(No body content provided)'}\n{'-'*20}",
-            f"\nAgent Processing Notes:"
-        ]
-        description_parts.extend([f"- {note}" for note in incident.processing_notes])
-        description = "\n".join(description_parts)
+        description = self._format_description(incident)
+
+        if issue_ids is not None:
+            project_field, issuetype_field = {'id': issue_ids[0]}, {'id': issue_ids[1]}
+        else:
+            project_field, issuetype_field = {'key': self.config.jira_project_key}, {'name': self.config.jira_p1_issue_type}
 
         issue_dict = {
-            'project': {'key': self.config.jira_project_key},
+            'project': project_field,
             'summary': summary,
             'description': description,
-            'issuetype': {'name': self.config.jira_p1_issue_type},
+            'issuetype': issuetype_field,
             # Optional: Add labels, components, custom fields, assignee, etc.
             # 'labels': ['auto-created', 'p1-incident', incident.assigned_team.lower() if incident.assigned_team else 'unassigned'],
             # 'components': [{'name': 'CriticalSystems'}], # Ensure component 'CriticalSystems' exists
@@ -111,37 +612,4 @@ class JiraHandler:
         # if 'assignee' in issue_dict and not issue_dict['assignee']['name']:
         #     del issue_dict['assignee']
 
-        try:
-            logger.info(f"Attempting to create Jira P1 ticket for incident {incident.id} in project '{self.config.jira_project_key}' with type '{self.config.jira_p1_issue_type}'.")
-            new_issue = self.jira_client.create_issue(fields=issue_dict)
-            
-            incident.jira_ticket_key = new_issue.key # Store the created ticket key (e.g., "ITSM-123")
-            message = f"Jira ticket {new_issue.key} created successfully."
-            incident.add_note(message)
-            logger.info(f"Incident {incident.id}: {message}")
-            return new_issue.key
-        except JIRAError as e:
-            # JIRAError can provide detailed error messages from the Jira API
-            error_message_detail = f"Jira API Error creating ticket: Status {e.status_code} - {e.text}."
-            # Log the full response if available and helpful
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_json = e.response.json()
-                    logger.error(f"Jira error response JSON for incident {incident.id}: {error_json}")
-                    # Extract specific errors if possible
-                    errors = error_json.get('errors', {})
-                    error_messages_list = error_json.get('errorMessages', [])
-                    if errors: error_message_detail += f" Field errors: {errors}."
-                    if error_messages_list: error_message_detail += f" Server messages: {', '.join(error_messages_list)}."
-                except ValueError: # If response is not JSON
-                    logger.error(f"Jira response content for incident {incident.id} was not JSON: {e.response.content}")
-            
-            incident.add_note(error_message_detail)
-            logger.error(f"Incident {incident.id}: {error_message_detail}", exc_info=True) # Log with stack trace
-        except Exception as e:
-            # Catch any other unexpected errors during Jira ticket creation
-            error_message = f"Unexpected error creating Jira ticket: {e}"
-            incident.add_note(error_message)
-            logger.error(f"Incident {incident.id}: {error_message}", exc_info=True)
-        
-        return None # Return None if ticket creation failed
\ No newline at end of file
+        return issue_dict
\ No newline at end of file
@@ -1,31 +1,68 @@
 # models.py
 
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List, Dict
+import collections
+from dataclasses import dataclass, field
+from typing import Deque, Optional
 
-class Incident(BaseModel):
+# Processing notes kept per incident; once reached, the oldest note is dropped for each new one.
+MAX_PROCESSING_NOTES = 500
+
+@dataclass(slots=True)
+class Incident:
     """
     Represents an incident being processed by the agent.
-    Uses Pydantic for data validation and clear structure.
+    A slotted dataclass: no per-instance __dict__, and construction is a plain attribute assignment.
+    Inputs are checked where they enter the agent (the email parser, and team emails at config load).
     """
-    id: str = Field(..., description="Unique ID for the incident, e.g., email Message-ID or an internal ID")
-    source: str = Field(..., description="Source of the incident, e.g., 'email', 'monitoring_tool_api'")
-    subject: str = Field(..., description="Subject line of the incident")
-    body: str = Field(..., description="Main content/body of the incident report")
-    raw_content: str = Field(..., description="Full raw content, e.g., full email bytes as string, for auditing or re-parsing")
+    id: str # Unique ID for the incident, e.g., email Message-ID or an internal ID
+    source: str # Source of the incident, e.g., 'email', 'monitoring_tool_api'
+    subject: str # Subject line of the incident
+    body: str # Main content/body of the incident report
+    raw_content: bytes # Full raw content, e.g., the email bytes as fetched, for auditing or re-parsing (see raw_content_text)
+    message_id: Optional[str] = None # Original Message-ID header including angle brackets, for threading replies (None if absent)
+    sender: str = "" # Reporter address, e.g., the email From address (empty if unknown)
+    imap_uid: Optional[str] = None # IMAP UID the email was fetched under, for fetching it again in full (None if not from IMAP)
+    body_truncated: bool = False # True if only a prefix of the body was fetched (see email_handler.TRIAGE_BODY_BYTES)
 
     # Fields to be populated by the agent during processing
-    priority: Optional[str] = Field(None, description="Assigned priority, e.g., 'P1', 'P2', 'P3', 'P4'")
-    assigned_team: Optional[str] = Field(None, description="Name of the team assigned to this incident")
-    assigned_team_email: Optional[EmailStr] = Field(None, description="Email address of the assigned team")
-    is_acknowledged: bool = Field(False, description="Flag indicating if an acknowledgement has been sent")
-    jira_ticket_key: Optional[str] = Field(None, description="Jira ticket key if a ticket was created (e.g., 'ITSM-123')")
-    processing_notes: List[str] = Field(default_factory=list, description="Log of actions and decisions made by the agent for this incident")
+    priority: Optional[str] = None # Assigned priority, e.g., 'P1', 'P2', 'P3', 'P4'
+    assigned_team: Optional[str] = None # Name of the team assigned to this incident
+    assigned_team_email: Optional[str] = None # Email address of the assigned team
+    is_acknowledged: bool = False # Flag indicating if an acknowledgement has been sent
+    jira_ticket_key: Optional[str] = None # Jira ticket key if a ticket was created (e.g., 'ITSM-123')
+    # Log of actions and decisions made by the agent for this incident (the most recent MAX_PROCESSING_NOTES)
+    processing_notes: Deque[str] = field(default_factory=lambda: collections.deque(maxlen=MAX_PROCESSING_NOTES))
+
+    # Cache for `search_text` (not a constructor argument, and left out of repr/comparisons)
+    _search_text: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Notes passed in as a list (or an unbounded deque) are bounded like the default.
+        if not isinstance(self.processing_notes, collections.deque) or self.processing_notes.maxlen != MAX_PROCESSING_NOTES:
+            self.processing_notes = collections.deque(self.processing_notes, maxlen=MAX_PROCESSING_NOTES)
+
+    @property
+    def search_text(self) -> str:
+        """
+        Subject and body joined and casefolded for keyword matching, computed once per incident.
+        (Subject and body are not expected to change once the incident has been parsed.)
+        """
+        if self._search_text is None:
+            self._search_text = (self.subject + " " + self.body).casefold()
+        return self._search_text
+
+    @property
+    def raw_content_text(self) -> str:
+        """Raw content decoded for display (debugging/audit); decoded on each access rather than stored."""
+        return self.raw_content.decode('utf-8', errors='replace')
+
+    def replace_content(self, body: str, raw_content: bytes):
+        """Replaces a truncated body and raw content with the complete ones, e.g. after a full fetch."""
+        self.body = body
+        self.raw_content = raw_content
+        self.body_truncated = False
+        self._search_text = None
 
     def add_note(self, note: str):
         """Helper method to add a processing note to the incident."""
         self.processing_notes.append(note)
-
-    class Config:
-        # Allows Pydantic to work well with ORMs or other data sources if needed later
-        orm_mode = True
\ No newline at end of file
@@ -0,0 +1,195 @@
+# tests/test_agent.py
+
+import asyncio
+import collections
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import agent as agent_module
+from agent import IncidentManagementAgent
+from jira_handler import JiraTransientError
+from models import Incident
+
+
+def _p1_incident(incident_id: str) -> Incident:
+    return Incident(id=incident_id, source='email', subject='Database down', body='db01 is down',
+                    raw_content=b'', sender='ops@example.com', priority='P1')
+
+
+class _StubJiraHandler:
+    """
+    Stands in for JiraHandler: `create_jira_tickets_bulk` raises the next exception from `failures`
+    (None for success) and otherwise files one ticket per incident.
+    """
+    BULK_CREATE_MAX_ISSUES = 50
+
+    def __init__(self, *failures):
+        self.failures = list(failures)
+        self.batches = []
+
+    def ensure_connected(self):
+        return True
+
+    def create_jira_tickets_bulk(self, incidents):
+        self.batches.append([incident.id for incident in incidents])
+        failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            raise failure
+        for incident in incidents:
+            incident.jira_ticket_key = f'ITSM-{incident.id}'
+        return [incident.jira_ticket_key for incident in incidents]
+
+
+class _StubEmailHandler:
+    """Stands in for EmailHandler: each fetch returns the next list from `cycles`."""
+    def __init__(self, *cycles):
+        self.cycles = list(cycles)
+        self.acknowledged = []
+
+    def fetch_new_incidents_from_email(self):
+        return self.cycles.pop(0) if self.cycles else []
+
+    def fetch_full_bodies(self, incidents):
+        pass
+
+    def send_acknowledgement_emails(self, incidents):
+        self.acknowledged.extend(incidents)
+
+
+class _StubClassifier:
+    """Classifies every incident as a P1 of one team."""
+    def classify_incident_priority(self, incident):
+        return 'P1'
+
+    def assign_incident_to_team(self, incident):
+        return 'DatabaseTeam', 'db-admins@example.com'
+
+
+def _make_agent(jira_handler=None, email_handler=None, **overrides) -> IncidentManagementAgent:
+    """Builds an agent around stub handlers, without loading config.ini or connecting anywhere."""
+    settings = dict(
+        agent_name='TestAgent', jira_max_retries=2, jira_max_concurrent=2, duplicate_window_minutes=30,
+        check_interval_seconds=60, min_check_interval_seconds=10, max_check_interval_seconds=300,
+    )
+    settings.update(overrides)
+    agent = IncidentManagementAgent.__new__(IncidentManagementAgent)
+    agent.config = types.SimpleNamespace(**settings)
+    agent.jira_handler = jira_handler or _StubJiraHandler()
+    agent.email_handler = email_handler or _StubEmailHandler()
+    agent.classifier = _StubClassifier()
+    agent._pool = ThreadPoolExecutor(max_workers=2)
+    agent._seen = collections.OrderedDict()
+    agent._current_interval = settings['check_interval_seconds']
+    agent._jira_sem = None
+    return agent
+
+
+class CheckCycleTests(unittest.TestCase):
+    def test_cycle_run_without_start_agent_creates_tickets(self):
+        # The Jira semaphore is created on first use, not only by start_agent().
+        incident = _p1_incident('one-shot')
+        agent = _make_agent(email_handler=_StubEmailHandler([incident]))
+        self.addCleanup(agent._pool.shutdown)
+        self.assertEqual(asyncio.run(agent.run_incident_check_cycle()), 1)
+        self.assertEqual(agent.jira_handler.batches, [['one-shot']])
+        self.assertEqual(agent.email_handler.acknowledged, [incident])
+
+
+class JiraRetryTests(unittest.TestCase):
+    def _create(self, jira_handler, incidents):
+        agent = _make_agent(jira_handler)
+        self.addCleanup(agent._pool.shutdown)
+        return asyncio.run(agent._create_jira_tickets(incidents))
+
+    def test_transient_error_is_retried(self):
+        jira_handler = _StubJiraHandler(JiraTransientError("HTTP 503", retry_after=0))
+        self.assertEqual(self._create(jira_handler, [_p1_incident('retried')]), ['ITSM-retried'])
+        self.assertEqual(len(jira_handler.batches), 2)
+
+    def test_gives_up_after_max_retries(self):
+        jira_handler = _StubJiraHandler(*[JiraTransientError("HTTP 503", retry_after=0)] * 3)
+        incident = _p1_incident('exhausted')
+        self.assertEqual(self._create(jira_handler, [incident]), [None])
+        self.assertEqual(len(jira_handler.batches), 3) # jira_max_retries=2
+        self.assertIn("after 3 attempts", incident.processing_notes[-1])
+
+    def test_retry_after_above_the_cap_gives_up_without_waiting(self):
+        retry_after = agent_module.JIRA_MAX_RETRY_DELAY_SECONDS + 1
+        jira_handler = _StubJiraHandler(JiraTransientError("HTTP 429", retry_after=retry_after))
+        incident = _p1_incident('rate-limited')
+        with mock.patch.object(agent_module.asyncio, 'sleep') as sleep:
+            self.assertEqual(self._create(jira_handler, [incident]), [None])
+        sleep.assert_not_called()
+        self.assertEqual(len(jira_handler.batches), 1)
+        self.assertIn("longer than the agent waits", incident.processing_notes[-1])
+
+    def test_failing_batch_keeps_the_tickets_of_the_others(self):
+        jira_handler = _StubJiraHandler(RuntimeError("unexpected"), None)
+        jira_handler.BULK_CREATE_MAX_ISSUES = 2
+        incidents = [_p1_incident(f'batch-{n}') for n in range(4)]
+        agent = _make_agent(jira_handler)
+        self.addCleanup(agent._pool.shutdown)
+        asyncio.run(agent._create_p1_tickets(incidents))
+        failed = [incident for incident in incidents if incident.jira_ticket_key is None]
+        self.assertEqual(len(failed), 2)
+        self.assertEqual(len(jira_handler.batches), 2)
+        for incident in failed:
+            self.assertIn("Unexpected error creating Jira ticket", incident.processing_notes[-1])
+        for incident in incidents:
+            if incident not in failed:
+                self.assertEqual(incident.jira_ticket_key, f'ITSM-{incident.id}')
+
+
+class DuplicateWindowTests(unittest.TestCase):
+    def setUp(self):
+        self.agent = _make_agent(duplicate_window_minutes=30)
+        self.addCleanup(self.agent._pool.shutdown)
+
+    def _drop_duplicates_at(self, monotonic_time, incidents):
+        with mock.patch.object(agent_module.time, 'monotonic', return_value=monotonic_time):
+            return self.agent._drop_duplicate_incidents(incidents)
+
+    def test_duplicate_inside_the_window_is_dropped(self):
+        first, repeat = _p1_incident('first'), _p1_incident('repeat')
+        self.assertEqual(self._drop_duplicates_at(1000.0, [first]), [first])
+        self.assertEqual(self._drop_duplicates_at(1000.0 + 29 * 60, [repeat]), [])
+        self.assertEqual(self.agent._seen[self.agent._content_key(first)], ('first', 1000.0, 2))
+
+    def test_duplicate_after_the_window_is_processed(self):
+        first, repeat = _p1_incident('first'), _p1_incident('repeat')
+        self._drop_duplicates_at(1000.0, [first])
+        self.assertEqual(self._drop_duplicates_at(1000.0 + 30 * 60, [repeat]), [repeat])
+
+    def test_duplicates_do_not_extend_the_window(self):
+        self._drop_duplicates_at(1000.0, [_p1_incident('first')])
+        self._drop_duplicates_at(1000.0 + 20 * 60, [_p1_incident('repeat-1')])
+        repeat = _p1_incident('repeat-2')
+        self.assertEqual(self._drop_duplicates_at(1000.0 + 31 * 60, [repeat]), [repeat])
+
+    def test_duplicates_within_one_cycle(self):
+        first, repeat = _p1_incident('first'), _p1_incident('repeat')
+        self.assertEqual(self._drop_duplicates_at(1000.0, [first, repeat]), [first])
+
+
+class CheckIntervalTests(unittest.TestCase):
+    def setUp(self):
+        self.agent = _make_agent(min_check_interval_seconds=10, max_check_interval_seconds=300)
+        self.addCleanup(self.agent._pool.shutdown)
+
+    def test_quiet_cycle_backs_off_up_to_the_maximum(self):
+        self.agent._current_interval = 60
+        self.assertEqual(self.agent._next_check_interval(0), 90)
+        self.agent._current_interval = 250
+        self.assertEqual(self.agent._next_check_interval(0), 300)
+
+    def test_busy_cycle_halves_down_to_the_minimum(self):
+        self.agent._current_interval = 60
+        self.assertEqual(self.agent._next_check_interval(3), 30)
+        self.agent._current_interval = 15
+        self.assertEqual(self.agent._next_check_interval(1), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
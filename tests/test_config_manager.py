@@ -0,0 +1,44 @@
+# tests/test_config_manager.py
+
+import os
+import tempfile
+import unittest
+
+from config_manager import ConfigManager
+
+_INI = """\
+[Teams]
+DatabaseTeam = down, café
+
+[TeamEmails]
+databaseteam = db-admins@example.com
+
+[PriorityKeywords]
+P1 = system down
+"""
+
+
+class KeywordRegexTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        ini_path = os.path.join(tmp.name, 'config.ini')
+        with open(ini_path, 'w', encoding='utf-8') as f:
+            f.write(_INI)
+        self.config = ConfigManager(ini_path)
+
+    def test_keyword_matches_as_a_whole_word(self):
+        pattern = self.config.team_keywords_re['databaseteam']
+        self.assertEqual(pattern.search("db01 is down since 9am").group(1), 'down')
+        self.assertIsNone(pattern.search("countdown started"))
+
+    def test_word_boundaries_follow_unicode_word_characters(self):
+        pattern = self.config.team_keywords_re['databaseteam']
+        # "á" is a word character, so there is no boundary before "down".
+        self.assertIsNone(pattern.search("ádown"))
+        # A keyword ending in a non-ASCII letter still ends at the following space.
+        self.assertEqual(pattern.search("the café wifi").group(1), 'café')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+# tests/test_email_handler.py
+
+import imaplib
+import os
+import socket
+import tempfile
+import threading
+import time
+import types
+import unittest
+
+import email_handler
+from email_handler import EmailHandler
+from incident_parser import IncidentParser
+
+
+class _FakeIdleServer:
+    """
+    Minimal IMAP server on localhost for IDLE tests. After the client's IDLE command it sends
+    `idle_reply` in a single write, then answers DONE and LOGOUT.
+    """
+    def __init__(self, idle_reply: bytes):
+        self.idle_reply = idle_reply
+        self._listener = socket.create_server(('127.0.0.1', 0))
+        self.port = self._listener.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        conn, _ = self._listener.accept()
+        with conn, conn.makefile('rb') as lines:
+            conn.sendall(b'* OK fake server ready\r\n')
+            for line in lines:
+                tag, _, command = line.rstrip(b'\r\n').partition(b' ')
+                command = command.upper()
+                if command == b'CAPABILITY':
+                    conn.sendall(b'* CAPABILITY IMAP4rev1 IDLE\r\n' + tag + b' OK CAPABILITY completed\r\n')
+                elif command == b'IDLE':
+                    idle_tag = tag
+                    conn.sendall(self.idle_reply)
+                elif tag.upper() == b'DONE':
+                    conn.sendall(idle_tag + b' OK IDLE terminated\r\n')
+                elif command == b'LOGOUT':
+                    conn.sendall(b'* BYE logging out\r\n' + tag + b' OK LOGOUT completed\r\n')
+                    return
+
+    def close(self):
+        self._listener.close()
+        self._thread.join(timeout=5)
+
+
+class WaitForNewMailTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        config = types.SimpleNamespace(state_db_path=os.path.join(self._tmpdir.name, 'state.db'))
+        self.handler = EmailHandler(config, parser=None)
+        self.server = None
+
+    def tearDown(self):
+        self.handler.close()
+        if self.server:
+            self.server.close()
+        self._tmpdir.cleanup()
+
+    def _connect(self, idle_reply: bytes):
+        self.server = _FakeIdleServer(idle_reply)
+        self.handler._idle_conn = imaplib.IMAP4('127.0.0.1', self.server.port)
+
+    def test_exists_sent_with_continuation_is_seen_immediately(self):
+        # Regression: the EXISTS line arrived in the same segment as the continuation and sat in
+        # imaplib's read buffer, invisible to select(), until the IDLE timeout expired.
+        self._connect(b'+ idling\r\n* 1 EXPUNGE\r\n* 5 EXISTS\r\n')
+        started = time.monotonic()
+        self.assertTrue(self.handler.wait_for_new_mail(timeout=5))
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_returns_false_on_timeout(self):
+        self._connect(b'+ idling\r\n')
+        self.assertFalse(self.handler.wait_for_new_mail(timeout=0.2))
+
+    def test_interrupt_ends_the_wait(self):
+        self._connect(b'+ idling\r\n')
+        threading.Timer(0.1, self.handler.interrupt_idle).start()
+        started = time.monotonic()
+        self.assertFalse(self.handler.wait_for_new_mail(timeout=5))
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_rejected_idle_returns_none(self):
+        self._connect(b'IDLE1 BAD IDLE not supported\r\n')
+        self.assertIsNone(self.handler.wait_for_new_mail(timeout=5))
+
+
+class FetchResponseParsingTests(unittest.TestCase):
+    def test_uid_before_the_literals(self):
+        msg_data = [
+            (b'1 (UID 7 BODY[HEADER] {5}', b'hdr-7'), (b' BODY[TEXT]<0> {6}', b'text-7'), b')',
+            (b'2 (UID 8 BODY[HEADER] {5}', b'hdr-8'), (b' BODY[TEXT]<0> {6}', b'text-8'), b')',
+        ]
+        self.assertEqual(EmailHandler._extract_fetch_payloads(msg_data),
+                         {b'7': [b'hdr-7', b'text-7'], b'8': [b'hdr-8', b'text-8']})
+
+    def test_uid_after_the_literals(self):
+        msg_data = [(b'1 (RFC822 {5}', b'raw-7'), b' UID 7)', (b'2 (RFC822 {5}', b'raw-8'), b' UID 8)']
+        self.assertEqual(EmailHandler._extract_fetch_payloads(msg_data), {b'7': [b'raw-7'], b'8': [b'raw-8']})
+
+    def test_unsolicited_fetch_lines_are_ignored(self):
+        msg_data = [
+            b'3 (FLAGS (\\Seen))',
+            (b'1 (UID 7 RFC822 {5}', b'raw-7'), b')',
+            b'4 (UID 12 FLAGS (\\Seen))',
+            (b'2 (UID 8 RFC822 {5}', b'raw-8'), b')',
+        ]
+        self.assertEqual(EmailHandler._extract_fetch_payloads(msg_data), {b'7': [b'raw-7'], b'8': [b'raw-8']})
+
+    def test_message_without_uid_is_left_out(self):
+        msg_data = [(b'1 (RFC822 {5}', b'raw-?'), b')', (b'2 (UID 8 RFC822 {5}', b'raw-8'), b')']
+        self.assertEqual(EmailHandler._extract_fetch_payloads(msg_data), {b'8': [b'raw-8']})
+
+
+class UidSetTests(unittest.TestCase):
+    def test_consecutive_uids_collapse_into_ranges(self):
+        self.assertEqual(EmailHandler._uid_set([b'10', b'4', b'5', b'6', b'7', b'12', b'13']), b'4:7,10,12:13')
+
+    def test_single_uid(self):
+        self.assertEqual(EmailHandler._uid_set([b'9']), b'9')
+
+    def test_expand_ranges_and_single_uids(self):
+        self.assertEqual(EmailHandler._expand_uid_set(b'4:6,10'), [b'4', b'5', b'6', b'10'])
+
+    def test_expand_reversed_range(self):
+        self.assertEqual(EmailHandler._expand_uid_set(b'6:4'), [b'4', b'5', b'6'])
+
+    def test_expand_undoes_collapse(self):
+        uids = [b'1', b'2', b'3', b'5', b'8', b'9']
+        self.assertEqual(EmailHandler._expand_uid_set(EmailHandler._uid_set(uids)), uids)
+
+
+class _FakeMailServer:
+    """
+    Stands in for a selected imaplib connection: UID FETCH returns `fetch_reply` (status, data), and
+    the UID sets of UID STORE commands are recorded.
+    """
+    state = 'SELECTED'
+
+    def __init__(self, fetch_reply):
+        self.fetch_reply = fetch_reply
+        self.fetch_specs = []
+        self.stored_uid_sets = []
+
+    def noop(self):
+        return 'OK', [b'']
+
+    def uid(self, command, uid_set, *args):
+        if command == 'STORE':
+            self.stored_uid_sets.append(uid_set)
+            return 'OK', [b'']
+        self.fetch_specs.append(args[0])
+        return self.fetch_reply
+
+
+class TruncatedBodyTests(unittest.TestCase):
+    HEADERS = b'From: ops@example.com\r\nSubject: Outage\r\nMessage-ID: <big@example.com>\r\n\r\n'
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        config = types.SimpleNamespace(state_db_path=os.path.join(tmp.name, 'state.db'), sender_email='agent@example.com')
+        self.handler = EmailHandler(config, IncidentParser())
+        self.addCleanup(self.handler.close)
+        self.full_text = b'line of log output\r\n' * 5000 # ~100 KB
+        self.triage_text = self.full_text[:email_handler.TRIAGE_BODY_BYTES]
+
+    def _use_mail_server(self, fetch_reply) -> _FakeMailServer:
+        mail_server = _FakeMailServer(fetch_reply)
+        self.handler._imap, self.handler._imap_last_used = mail_server, time.monotonic()
+        return mail_server
+
+    def test_body_cut_at_the_triage_limit_is_flagged(self):
+        incident = self.handler._parse_payload(b'7', [self.HEADERS, self.triage_text])
+        self.assertTrue(incident.body_truncated)
+        self.assertEqual(incident.imap_uid, '7')
+        self.assertIn("Only the first 64 KB", incident.processing_notes[-1])
+
+    def test_short_body_is_not_flagged(self):
+        incident = self.handler._parse_payload(b'7', [self.HEADERS, b'db01 is down\r\n'])
+        self.assertFalse(incident.body_truncated)
+
+    def test_fetch_full_bodies_replaces_the_truncated_body(self):
+        incident = self.handler._parse_payload(b'7', [self.HEADERS, self.triage_text])
+        mail_server = self._use_mail_server(('OK', [
+            (b'1 (UID 7 BODY[HEADER] {%d}' % len(self.HEADERS), self.HEADERS),
+            (b' BODY[TEXT] {%d}' % len(self.full_text), self.full_text), b')',
+        ]))
+        self.handler.fetch_full_bodies([incident])
+        self.assertEqual(mail_server.fetch_specs, [email_handler._FULL_FETCH_SPEC])
+        self.assertFalse(incident.body_truncated)
+        self.assertEqual(incident.body, self.full_text.decode().strip())
+        self.assertEqual(incident.raw_content, self.HEADERS + self.full_text)
+
+    def test_failed_full_fetch_keeps_the_flag(self):
+        incident = self.handler._parse_payload(b'7', [self.HEADERS, self.triage_text])
+        self._use_mail_server(('NO', [b'message expunged']))
+        self.handler.fetch_full_bodies([incident])
+        self.assertTrue(incident.body_truncated)
+        self.assertIn("could not be fetched", incident.processing_notes[-1])
+
+    def test_complete_bodies_are_not_fetched_again(self):
+        incident = self.handler._parse_payload(b'7', [self.HEADERS, b'db01 is down\r\n'])
+        mail_server = self._use_mail_server(('OK', []))
+        self.handler.fetch_full_bodies([incident])
+        self.assertEqual(mail_server.fetch_specs, [])
+
+
+class _FailingParser(IncidentParser):
+    """IncidentParser that raises for the email with IMAP UID `failing_uid`."""
+    def __init__(self, failing_uid: str):
+        super().__init__()
+        self.failing_uid = failing_uid
+
+    def parse_parts_to_incident(self, imap_msg_uid, headers_bytes, text_bytes, agent_sender_email=None):
+        if imap_msg_uid == self.failing_uid:
+            raise RuntimeError("parser bug")
+        return super().parse_parts_to_incident(imap_msg_uid, headers_bytes, text_bytes, agent_sender_email)
+
+
+class FetchChunkTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        config = types.SimpleNamespace(state_db_path=os.path.join(tmp.name, 'state.db'), sender_email='agent@example.com')
+        self.handler = EmailHandler(config, _FailingParser(failing_uid='8'))
+        self.addCleanup(self.handler.close)
+
+    @staticmethod
+    def _fetch_reply(uids):
+        data = []
+        for seq, uid in enumerate(uids, 1):
+            headers = b'From: ops@example.com\r\nSubject: Alert %d\r\nMessage-ID: <%d@example.com>\r\n\r\n' % (uid, uid)
+            data += [(b'%d (UID %d BODY[HEADER] {%d}' % (seq, uid, len(headers)), headers),
+                     (b' BODY[TEXT]<0> {4}', b'down'), b')']
+        return 'OK', data
+
+    def test_parse_error_does_not_lose_the_rest_of_the_chunk(self):
+        mail_server = _FakeMailServer(self._fetch_reply([7, 8, 9]))
+        new_incidents = []
+        self.handler._fetch_chunk(mail_server, [b'7', b'8', b'9'], new_incidents)
+        self.assertEqual([incident.id for incident in new_incidents], ['7@example.com', '9@example.com'])
+        # The failed email is marked seen like any unprocessable one, so it is not fetched again every cycle.
+        self.assertEqual(mail_server.stored_uid_sets, [b'7:9'])
+
+    def test_emails_recorded_before_an_error_are_marked_seen(self):
+        mail_server = _FakeMailServer(self._fetch_reply([7, 8, 9]))
+        record_incident = self.handler._record_incident
+
+        def fail_on_second(imap_msg_uid_bytes, incident, new_incidents):
+            if imap_msg_uid_bytes == b'8':
+                raise RuntimeError("store unavailable")
+            record_incident(imap_msg_uid_bytes, incident, new_incidents)
+        self.handler._record_incident = fail_on_second
+        with self.assertRaises(RuntimeError):
+            self.handler._fetch_chunk(mail_server, [b'7', b'8', b'9'], [])
+        self.assertEqual(mail_server.stored_uid_sets, [b'7'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# tests/test_incident_classifier.py
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import incident_classifier
+from config_manager import ConfigManager
+
+KEYWORDS = ['down', 'system down', 'c++', '.net', 'sev-1:', 'café', '_db_']
+
+TEXTS = [
+    'db01 is down', 'countdown started', 'ádown', 'down', 'the system down since 9am',
+    'c++ build failed', 'libc++ build', 'c++x', 'the .net runtime', 'asp.net crashed', 'x.netty',
+    'sev-1: outage', 'sev-1:x', 'sev-1:', 'café down', 'cafés', 'le café', 'my_db_ is slow', 'a _db_ b',
+    'déjà down.', '',
+]
+
+
+class WordBoundaryParityTests(unittest.TestCase):
+    """The accelerated matchers must find exactly the keywords the regex fallback finds."""
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        ini_path = os.path.join(tmp.name, 'config.ini')
+        with open(ini_path, 'w', encoding='utf-8') as f:
+            f.write('[Teams]\n[TeamEmails]\n[PriorityKeywords]\n')
+        self.config = ConfigManager(ini_path)
+
+    def _regex_hits(self, text):
+        return {kw for kw in KEYWORDS if self.config._compile_keyword_regex([kw]).search(text)}
+
+    def _assert_matches_regex(self, matcher_hits):
+        for text in TEXTS:
+            with self.subTest(text=text):
+                self.assertEqual(matcher_hits(text), self._regex_hits(text))
+
+    def test_regex_rule(self):
+        self.assertEqual(self._regex_hits('c++ build failed'), set())
+        self.assertEqual(self._regex_hits('c++x'), {'c++'})
+        self.assertEqual(self._regex_hits('ádown'), set())
+
+    def test_str_find(self):
+        self._assert_matches_regex(
+            lambda text: {kw for kw in KEYWORDS if incident_classifier._contains_whole_word(text, kw)})
+
+    @unittest.skipIf(incident_classifier.ahocorasick is None, "pyahocorasick is not installed")
+    def test_aho_corasick(self):
+        with mock.patch.object(incident_classifier, 'hyperscan', None):
+            matcher = incident_classifier._build_matcher({'all': frozenset(KEYWORDS)})
+        self._assert_matches_regex(
+            lambda text: {kw for kw, _ in incident_classifier._keyword_hits(matcher, text)})
+
+    @unittest.skipIf(incident_classifier.hyperscan is None, "hyperscan is not installed")
+    def test_hyperscan(self):
+        matcher = incident_classifier._build_matcher({'all': frozenset(KEYWORDS)})
+        self.assertIsInstance(matcher, incident_classifier._HyperscanMatcher)
+        self._assert_matches_regex(lambda text: {kw for kw, _ in matcher.scan(text)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# tests/test_incident_store.py
+
+import os
+import tempfile
+import unittest
+
+from incident_store import BloomFilter, ProcessedIncidentStore
+
+
+class BloomFilterTests(unittest.TestCase):
+    def test_added_items_are_always_found(self):
+        bloom = BloomFilter(capacity=1000, error_rate=1e-3)
+        items = [f'<msg-{n}@example.com>' for n in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+
+    def test_false_positives_stay_near_the_error_rate(self):
+        bloom = BloomFilter(capacity=1000, error_rate=1e-2)
+        for n in range(1000):
+            bloom.add(f'added-{n}')
+        false_positives = sum(f'absent-{n}' in bloom for n in range(10_000))
+        self.assertLess(false_positives, 300) # ~100 expected at 1%
+
+
+class ProcessedIncidentStoreTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db_path = os.path.join(tmp.name, 'state.db')
+
+    def test_added_id_is_known_before_flush(self):
+        store = ProcessedIncidentStore(self.db_path, capacity=100)
+        self.addCleanup(store.close)
+        self.assertNotIn('<a@example.com>', store)
+        store.add('<a@example.com>')
+        self.assertIn('<a@example.com>', store)
+
+    def test_flushed_ids_survive_a_reload(self):
+        store = ProcessedIncidentStore(self.db_path, capacity=100)
+        store.add('<a@example.com>')
+        store.add('<b@example.com>')
+        store.flush()
+        store.close()
+
+        reloaded = ProcessedIncidentStore(self.db_path, capacity=100)
+        self.addCleanup(reloaded.close)
+        self.assertIn('<a@example.com>', reloaded)
+        self.assertIn('<b@example.com>', reloaded)
+        self.assertNotIn('<c@example.com>', reloaded)
+
+    def test_close_flushes_pending_ids(self):
+        store = ProcessedIncidentStore(self.db_path, capacity=100)
+        store.add('<a@example.com>')
+        store.close()
+
+        reloaded = ProcessedIncidentStore(self.db_path, capacity=100)
+        self.addCleanup(reloaded.close)
+        self.assertIn('<a@example.com>', reloaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,260 @@
+# tests/test_jira_handler.py
+
+import threading
+import types
+import unittest
+
+import requests
+import urllib3
+from jira import JIRAError
+
+import jira_handler
+from jira_handler import JiraHandler, JiraTransientError
+from models import Incident
+
+
+def _make_config(**overrides):
+    settings = dict(
+        agent_name='TestAgent', jira_url='https://jira.example.com', jira_username='user', jira_api_token='token',
+        jira_project_key='ITSM', jira_p1_issue_type='Incident', async_workers=5,
+        jira_connect_timeout=10, jira_read_timeout=120, jira_body_limit=30000,
+    )
+    settings.update(overrides)
+    return types.SimpleNamespace(**settings)
+
+
+def _p1_incident(incident_id: str) -> Incident:
+    return Incident(id=incident_id, source='email', subject='Database down', body='db01 is down',
+                    raw_content=b'', priority='P1')
+
+
+class _FakeIssue:
+    def __init__(self, key):
+        self.key = key
+
+
+class _FakeJiraClient:
+    """
+    Stands in for jira.JIRA: `create_issue` runs `behaviour` (raise or return a key), and `project` runs
+    `project_behaviour` if given before returning the project.
+    """
+    def __init__(self, behaviour, project_behaviour=None):
+        self.behaviour = behaviour
+        self.project_behaviour = project_behaviour
+        self.create_calls = 0
+        self.project_calls = 0
+        self.created_fields = []
+        self.attachments = {} # File name -> attached bytes
+
+    def project(self, key):
+        self.project_calls += 1
+        if self.project_behaviour:
+            self.project_behaviour()
+        return types.SimpleNamespace(id='10000', raw={'issueTypes': [{'id': '10001', 'name': 'Incident'}]})
+
+    def create_issue(self, fields):
+        self.create_calls += 1
+        self.created_fields.append(fields)
+        return _FakeIssue(self.behaviour())
+
+    def add_attachment(self, issue, attachment, filename):
+        self.attachments[filename] = attachment.read()
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self.handler = JiraHandler(_make_config())
+
+    def _fail(self):
+        raise requests.exceptions.ConnectTimeout("connect timed out")
+
+    def _open_circuit(self):
+        self.handler.jira_client = _FakeJiraClient(self._fail)
+        for n in range(jira_handler.CIRCUIT_FAILURE_THRESHOLD):
+            with self.assertRaises(JiraTransientError):
+                self.handler.create_jira_ticket_for_incident(_p1_incident(f'fail-{n}'))
+
+    def test_open_circuit_skips_requests_and_says_no_ticket_will_be_created(self):
+        self._open_circuit()
+        calls = self.handler.jira_client.create_calls
+        incident = _p1_incident('skipped')
+        self.assertIsNone(self.handler.create_jira_ticket_for_incident(incident))
+        self.assertEqual(self.handler.jira_client.create_calls, calls)
+        self.assertIn("No Jira ticket will be created automatically", incident.processing_notes[-1])
+
+    def test_only_one_probe_after_the_open_period(self):
+        self._open_circuit()
+        self.handler._circuit_opened_at -= jira_handler.CIRCUIT_OPEN_SECONDS
+        probe_started, release_probe = threading.Event(), threading.Event()
+
+        def slow_success():
+            probe_started.set()
+            release_probe.wait(5)
+            return 'ITSM-1'
+        self.handler.jira_client = _FakeJiraClient(slow_success)
+        probe = threading.Thread(target=self.handler.create_jira_ticket_for_incident, args=(_p1_incident('probe'),))
+        probe.start()
+        self.assertTrue(probe_started.wait(5))
+        # While the probe is in flight, other requests still fail fast.
+        self.assertIsNone(self.handler.create_jira_ticket_for_incident(_p1_incident('during-probe')))
+        release_probe.set()
+        probe.join(5)
+        self.assertEqual(self.handler.jira_client.create_calls, 1)
+        # The successful probe closed the circuit.
+        self.assertEqual(self.handler.create_jira_ticket_for_incident(_p1_incident('after-probe')), 'ITSM-1')
+
+    def test_failed_probe_reopens_the_circuit(self):
+        self._open_circuit()
+        self.handler._circuit_opened_at -= jira_handler.CIRCUIT_OPEN_SECONDS
+        with self.assertRaises(JiraTransientError):
+            self.handler.create_jira_ticket_for_incident(_p1_incident('probe'))
+        calls = self.handler.jira_client.create_calls
+        self.assertIsNone(self.handler.create_jira_ticket_for_incident(_p1_incident('after-probe')))
+        self.assertEqual(self.handler.jira_client.create_calls, calls)
+
+
+class RetryableStatusTests(unittest.TestCase):
+    def setUp(self):
+        self.handler = JiraHandler(_make_config())
+
+    def _create_with_status(self, status_code: int) -> Incident:
+        def reject():
+            raise JIRAError(status_code=status_code, text='error', response=requests.Response())
+        self.handler.jira_client = _FakeJiraClient(reject)
+        incident = _p1_incident(f'status-{status_code}')
+        self.handler.create_jira_ticket_for_incident(incident)
+        return incident
+
+    def test_503_is_transient(self):
+        with self.assertRaises(JiraTransientError):
+            self._create_with_status(503)
+
+    def test_504_is_not_retried_but_counts_as_a_failure(self):
+        # The gateway timed out, but Jira may still have created the issue: retrying could file duplicates.
+        incident = self._create_with_status(504)
+        self.assertIsNone(incident.jira_ticket_key)
+        self.assertIn("may still have been created", incident.processing_notes[-1])
+        self.assertEqual(self.handler._consecutive_failures, 1)
+
+
+class ConnectionErrorTests(unittest.TestCase):
+    def setUp(self):
+        self.handler = JiraHandler(_make_config())
+
+    @staticmethod
+    def _aborted():
+        # What requests raises when a pooled keep-alive connection is closed after the request was sent.
+        raise requests.exceptions.ConnectionError(
+            urllib3.exceptions.ProtocolError('Connection aborted.', ConnectionResetError(104, 'Connection reset by peer')))
+
+    @staticmethod
+    def _refused():
+        raise requests.exceptions.ConnectionError(urllib3.exceptions.MaxRetryError(
+            None, '/rest/api/2/issue', urllib3.exceptions.NewConnectionError(None, 'Connection refused')))
+
+    def test_refused_connection_is_transient(self):
+        self.handler.jira_client = _FakeJiraClient(self._refused)
+        with self.assertRaises(JiraTransientError):
+            self.handler.create_jira_ticket_for_incident(_p1_incident('refused'))
+
+    def test_aborted_connection_is_not_retried(self):
+        self.handler.jira_client = _FakeJiraClient(self._aborted)
+        incident = _p1_incident('aborted')
+        self.assertIsNone(self.handler.create_jira_ticket_for_incident(incident))
+        self.assertIn("may still have been created", incident.processing_notes[-1])
+        self.assertEqual(self.handler._consecutive_failures, 1)
+
+    def test_aborted_bulk_create_is_not_retried(self):
+        client = _FakeJiraClient(None)
+
+        def create_issues(field_list, prefetch):
+            self._aborted()
+        client.create_issues = create_issues
+        self.handler.jira_client = client
+        incidents = [_p1_incident('bulk-aborted-1'), _p1_incident('bulk-aborted-2')]
+        self.assertEqual(self.handler.create_jira_tickets_bulk(incidents), [None, None])
+        for incident in incidents:
+            self.assertIn("may still have been created", incident.processing_notes[-1])
+
+
+class IssueIdLookupTests(unittest.TestCase):
+    def setUp(self):
+        self.handler = JiraHandler(_make_config())
+
+    def _unreachable(self):
+        raise requests.exceptions.ConnectTimeout("connect timed out")
+
+    def test_unreachable_jira_fails_the_lookup_without_attempting_the_create(self):
+        self.handler.jira_client = _FakeJiraClient(lambda: 'ITSM-1', project_behaviour=self._unreachable)
+        with self.assertRaises(JiraTransientError):
+            self.handler.create_jira_ticket_for_incident(_p1_incident('lookup-down'))
+        self.assertEqual(self.handler.jira_client.create_calls, 0)
+        self.assertEqual(self.handler._consecutive_failures, 1)
+
+    def test_failed_lookup_is_not_retried_until_the_back_off_has_passed(self):
+        self.handler.jira_client = _FakeJiraClient(lambda: 'ITSM-1', project_behaviour=self._unreachable)
+        with self.assertRaises(JiraTransientError):
+            self.handler.create_jira_ticket_for_incident(_p1_incident('first'))
+        # Within the back-off the ticket is created by name, without another lookup.
+        self.assertEqual(self.handler.create_jira_ticket_for_incident(_p1_incident('second')), 'ITSM-1')
+        self.assertEqual(self.handler.jira_client.project_calls, 1)
+        self.assertEqual(self.handler.jira_client.created_fields[-1]['project'], {'key': 'ITSM'})
+
+        self.handler._issue_ids_failed_at -= jira_handler.ISSUE_IDS_RETRY_SECONDS
+        self.handler.jira_client.project_behaviour = None
+        self.handler.create_jira_ticket_for_incident(_p1_incident('third'))
+        self.assertEqual(self.handler.jira_client.project_calls, 2)
+        self.assertEqual(self.handler.jira_client.created_fields[-1]['project'], {'id': '10000'})
+
+    def test_slow_lookup_does_not_block_other_requests(self):
+        lookup_started, release_lookup = threading.Event(), threading.Event()
+
+        def slow_lookup():
+            lookup_started.set()
+            release_lookup.wait(5)
+        self.handler.jira_client = _FakeJiraClient(lambda: 'ITSM-1', project_behaviour=slow_lookup)
+        first = threading.Thread(target=self.handler.create_jira_ticket_for_incident, args=(_p1_incident('first'),))
+        first.start()
+        self.assertTrue(lookup_started.wait(5))
+        # Created by name while the lookup is still running.
+        self.assertEqual(self.handler.create_jira_ticket_for_incident(_p1_incident('second')), 'ITSM-1')
+        self.assertEqual(self.handler.jira_client.created_fields[-1]['project'], {'key': 'ITSM'})
+        release_lookup.set()
+        first.join(5)
+        self.assertEqual(self.handler.jira_client.project_calls, 1)
+        self.assertEqual(self.handler._issue_ids, ('10000', '10001'))
+
+
+class LongBodyTests(unittest.TestCase):
+    def setUp(self):
+        self.handler = JiraHandler(_make_config())
+        self.handler.jira_client = _FakeJiraClient(lambda: 'ITSM-1')
+        # Longer than both the description limit and the email triage fetch (64 KB).
+        self.incident = _p1_incident('long-body')
+        self.incident.body = 'x' * (100 * 1024)
+
+    def test_complete_body_is_attached_in_full(self):
+        self.handler.create_jira_ticket_for_incident(self.incident)
+        description = self.handler.jira_client.created_fields[-1]['description']
+        self.assertIn(f"full text attached as {jira_handler.FULL_BODY_ATTACHMENT_NAME}", description)
+        self.assertEqual(self.handler.jira_client.attachments, {jira_handler.FULL_BODY_ATTACHMENT_NAME: self.incident.body.encode()})
+
+    def test_body_cut_at_the_fetch_limit_is_attached_as_partial(self):
+        self.incident.body_truncated = True
+        self.handler.create_jira_ticket_for_incident(self.incident)
+        description = self.handler.jira_client.created_fields[-1]['description']
+        self.assertNotIn("full text attached", description)
+        self.assertIn("the rest could not be fetched", description)
+        self.assertEqual(list(self.handler.jira_client.attachments), [jira_handler.PARTIAL_BODY_ATTACHMENT_NAME])
+        self.assertIn("Partial incident body", self.incident.processing_notes[-1])
+
+    def test_short_partial_body_is_marked_in_the_description(self):
+        self.incident.body = 'db01 is down'
+        self.incident.body_truncated = True
+        self.handler.create_jira_ticket_for_incident(self.incident)
+        self.assertIn("the rest could not be fetched", self.handler.jira_client.created_fields[-1]['description'])
+        self.assertEqual(self.handler.jira_client.attachments, {})
+
+
+if __name__ == '__main__':
+    unittest.main()